@@ -1,7 +1,11 @@
+from flask_migrate import upgrade
+
 from app import create_app
 
 app = create_app()
 
 if __name__ == "__main__":
+    # Development server only, see wsgi.py and gunicorn.conf.py for production
+    with app.app_context():
+        upgrade()  # the schema comes from the migrations
     app.run(debug=True)
-
@@ -1,20 +1,64 @@
 from flask import Flask
 from .models import db
+from .config import config_from_env, engine_options, init_sqlite_pragmas
+from .querycount import init_query_budget
+from .instrumentation import init_instrumentation
+from .quizbank import quiz_banks
+from .fragments import fragments
+from .auth import login_guard
+from .httpcache import init_http_cache
+from .assets import assets
 from flask_migrate import Migrate  
+from werkzeug.middleware.proxy_fix import ProxyFix
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///marketplace.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.secret_key = "secret"  # using your current key
+    # Database URI, pool and SQLite settings come from the environment, `config` overrides them
+    app.config.from_mapping(config_from_env())
+    app.config.from_mapping(config or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    if app.config.get('PROXY_FIX_HOPS'):
+        # remote_addr is the client's, not the proxy's, so the login guard's per-address limit stays per client
+        hops = app.config['PROXY_FIX_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
 
     db.init_app(app)
+    init_sqlite_pragmas(app)
     migrate = Migrate(app, db)  
+    init_query_budget(app)
+    init_instrumentation(app)
+    quiz_banks.init_app(app)
+    fragments.init_app(app)
+    login_guard.init_app(app)
+    assets.init_app(app)
+    init_http_cache(app)
 
     from .routes import main
     app.register_blueprint(main)
 
-    with app.app_context():
-        db.create_all()  # optional if you want, migrate handles schema later
+    from .api import api
+    app.register_blueprint(api)
+
+    from .bulk import bulk_cli
+    app.cli.add_command(bulk_cli)
+
+    from .search import search_cli
+    app.cli.add_command(search_cli)
+
+    from .counters import counters_cli
+    app.cli.add_command(counters_cli)
+
+    from .jobs import jobs_cli
+    from . import tasks  # noqa: F401  registers the job handlers
+    app.cli.add_command(jobs_cli)
+
+    from .recommend import recommend_cli
+    app.cli.add_command(recommend_cli)
+
+    from .analytics import analytics_cli
+    app.cli.add_command(analytics_cli)
+
+    from .assets import assets_cli
+    app.cli.add_command(assets_cli)
 
     return app
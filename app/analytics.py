@@ -0,0 +1,212 @@
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import db, Application, ApplicationDaily, Internship, Profile, RollupWatermark
+
+analytics_cli = AppGroup('analytics', help="Maintain the employer analytics rollups.")
+
+WATERMARK = 'application_daily'
+SCORE_BUCKETS = 10  # deciles, 100% falls in the last one
+COUNTERS = ('applicants', 'passed', 'score_total')
+KEY = ('internship_id', 'day', 'department', 'score_bucket')
+
+
+# --------------------------
+# Incremental refresh
+# --------------------------
+def _day():
+    return db.func.date(Application.applied_at, type_=db.Date)
+
+
+def _grouped(*criteria):
+    """Applications matching criteria grouped into rollup rows"""
+    score = db.func.coalesce(Application.quiz_score, 0)
+    day = _day()
+    department = db.func.coalesce(Profile.department, '')
+    bucket = db.case((score >= 100, SCORE_BUCKETS - 1), else_=score // 10)
+    return (
+        db.select(
+            Application.internship_id,
+            day.label('day'),
+            department.label('department'),
+            bucket.label('score_bucket'),
+            db.func.count(Application.id).label('applicants'),
+            db.func.sum(db.case((Application.quiz_passed == True, 1), else_=0)).label('passed'),  # noqa: E712
+            db.func.sum(score).label('score_total'),
+        )
+        .outerjoin(Profile, Profile.id == Application.student_id)
+        .where(*criteria)
+        .group_by(Application.internship_id, day, department, bucket)
+    )
+
+
+def _add_to_rollup(rows):
+    """Add grouped counts onto the rollup, creating missing rows, in one statement where the backend allows"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = (sqlite.insert if dialect == 'sqlite' else postgresql.insert)(ApplicationDaily)
+        insert = insert.from_select(KEY + COUNTERS, rows)
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=list(KEY),
+            set_={name: getattr(ApplicationDaily, name) + getattr(insert.excluded, name) for name in COUNTERS},
+        ))
+        return
+    for row in db.session.execute(rows):
+        rollup = db.session.get(ApplicationDaily, tuple(getattr(row, name) for name in KEY))
+        if rollup is None:
+            rollup = ApplicationDaily(**{name: getattr(row, name) for name in KEY}, applicants=0, passed=0, score_total=0)
+            db.session.add(rollup)
+        for name in COUNTERS:
+            setattr(rollup, name, getattr(rollup, name) + getattr(row, name))
+    db.session.flush()
+
+
+def refresh_rollups(batch_size=10000):
+    """Fold applications newer than the watermark into the daily rollup; returns how many were added.
+
+    Each batch moves the watermark in the same transaction as its counts,
+    so an interrupted run resumes where it stopped and never counts a row
+    twice. Applications younger than ANALYTICS_LAG_SECONDS wait for the
+    next run, giving transactions that took an earlier id time to commit.
+    """
+    watermark = db.session.get(RollupWatermark, WATERMARK)
+    if watermark is None:
+        watermark = RollupWatermark(name=WATERMARK, last_id=0)
+        db.session.add(watermark)
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config.get('ANALYTICS_LAG_SECONDS', 60))
+    added = 0
+    while True:
+        batch = (db.select(Application.id)
+                 .where(Application.id > watermark.last_id, Application.applied_at <= cutoff)
+                 .order_by(Application.id).limit(batch_size).subquery())
+        upto_id, count = db.session.execute(db.select(db.func.max(batch.c.id), db.func.count(batch.c.id))).one()
+        if not count:
+            break
+        _add_to_rollup(_grouped(Application.id > watermark.last_id, Application.id <= upto_id))
+        watermark.last_id = upto_id
+        watermark.refreshed_at = datetime.utcnow()
+        db.session.commit()
+        added += count
+    watermark.refreshed_at = datetime.utcnow()
+    db.session.commit()
+    return added
+
+
+def rollup_days(*criteria):
+    """[(internship_id, day)] of the rollup rows the applications matching criteria were counted in.
+
+    Call before deleting them, then hand the result to recount_rollups()
+    once they are gone. Only applications at or below the watermark were
+    counted, later ones are simply never folded in.
+    """
+    last_id = db.session.query(RollupWatermark.last_id).filter_by(name=WATERMARK).scalar()
+    if not last_id:
+        return []
+    return [tuple(row) for row in db.session.execute(
+        db.select(Application.internship_id, _day()).where(Application.id <= last_id, *criteria).distinct()
+    )]
+
+
+def recount_rollups(days):
+    """Recompute the rollup rows of these (internship_id, day) pairs from the applications left.
+
+    One DELETE and one INSERT ... SELECT, in the caller's transaction. Subtracting the deleted rows instead
+    would regroup them by the students' current department, which misses the
+    rollup row they were counted in when a student has changed department since.
+    """
+    if not days:
+        return
+    last_id = db.session.query(RollupWatermark.last_id).filter_by(name=WATERMARK).scalar()
+    db.session.execute(db.delete(ApplicationDaily)
+                       .where(db.tuple_(ApplicationDaily.internship_id, ApplicationDaily.day).in_(days))
+                       .execution_options(synchronize_session=False))
+    _add_to_rollup(_grouped(Application.id <= last_id, db.tuple_(Application.internship_id, _day()).in_(days)))
+
+
+def rebuild_rollups(batch_size=10000):
+    """Empty the rollup and fold every application in again"""
+    db.session.execute(db.delete(ApplicationDaily))
+    db.session.execute(db.delete(RollupWatermark).where(RollupWatermark.name == WATERMARK))
+    db.session.commit()
+    return refresh_rollups(batch_size)
+
+
+# --------------------------
+# Reading, from the rollup only
+# --------------------------
+def rollup_scope(employer_id, internship_id=None):
+    """Filter on the rollup for one of the employer's internships, or all of them"""
+    if internship_id is not None:
+        return ApplicationDaily.internship_id == internship_id
+    return ApplicationDaily.internship_id.in_(db.select(Internship.id).where(Internship.employer_id == employer_id))
+
+
+def _sums():
+    return [db.func.sum(getattr(ApplicationDaily, name)).label(name) for name in COUNTERS]
+
+
+def summarize(applicants=0, passed=0, score_total=0):
+    return {
+        'applicants': applicants,
+        'passed': passed,
+        'score_total': score_total,
+        'pass_rate': round(100 * passed / applicants) if applicants else 0,
+        'average_score': round(score_total / applicants) if applicants else 0,
+    }
+
+
+def totals_by_internship(employer_id):
+    """{internship_id: summarize(...)} over all time"""
+    rows = (db.session.query(ApplicationDaily.internship_id, *_sums())
+            .filter(rollup_scope(employer_id)).group_by(ApplicationDaily.internship_id))
+    return {row.internship_id: summarize(row.applicants, row.passed, row.score_total) for row in rows}
+
+
+def applicants_by_day(scope, days):
+    """[(day, applicants)] for the last `days` days, today included, zero-filled"""
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    counts = dict(db.session.query(ApplicationDaily.day, db.func.sum(ApplicationDaily.applicants))
+                  .filter(scope, ApplicationDaily.day >= since).group_by(ApplicationDaily.day))
+    return [(since + timedelta(days=n), counts.get(since + timedelta(days=n), 0)) for n in range(days)]
+
+
+def score_distribution(scope):
+    """Applicant count per score decile, index 0 is 0-9%"""
+    counts = dict(db.session.query(ApplicationDaily.score_bucket, db.func.sum(ApplicationDaily.applicants))
+                  .filter(scope).group_by(ApplicationDaily.score_bucket))
+    return [counts.get(bucket, 0) for bucket in range(SCORE_BUCKETS)]
+
+
+def by_department(scope):
+    """[(department, summarize(...))], most applicants first"""
+    sums = _sums()
+    rows = (db.session.query(ApplicationDaily.department, *sums)
+            .filter(scope).group_by(ApplicationDaily.department).order_by(sums[0].desc(), ApplicationDaily.department))
+    return [(row.department, summarize(row.applicants, row.passed, row.score_total)) for row in rows]
+
+
+def last_refreshed():
+    return db.session.query(RollupWatermark.refreshed_at).filter_by(name=WATERMARK).scalar()
+
+
+# --------------------------
+# Commands
+# --------------------------
+@analytics_cli.command('refresh')
+@click.option('--batch-size', default=10000, show_default=True, help="Applications per transaction.")
+def refresh_command(batch_size):
+    """Add new applications to the rollups, run this from cron every few minutes."""
+    added = refresh_rollups(batch_size)
+    click.echo(f"Added {added} applications to the analytics rollups.")
+
+
+@analytics_cli.command('rebuild')
+@click.option('--batch-size', default=10000, show_default=True, help="Applications per transaction.")
+def rebuild_command(batch_size):
+    """Recompute the rollups from scratch, e.g. after editing applications by hand."""
+    added = rebuild_rollups(batch_size)
+    click.echo(f"Rebuilt the analytics rollups from {added} applications.")
@@ -0,0 +1,222 @@
+from flask import Blueprint, abort, jsonify, request, session
+from sqlalchemy.orm import joinedload, lazyload
+from werkzeug.exceptions import HTTPException
+
+from .counters import row_count
+from .httpcache import conditional
+from .matching import match_internships
+from .models import db, Application, Internship, Profile
+from .pagination import MAX_PER_PAGE, page_size, paginate
+from .querycount import query_budget
+from .recommend import recommended_internships
+from .routes import applicants_version, student_dashboard_version
+from .search import search_internships
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+# --------------------------
+# Representations: field name -> getter, ?fields= picks a subset
+# --------------------------
+INTERNSHIP_FIELDS = {
+    'id': lambda i: i.id,
+    'title': lambda i: i.title,
+    'description': lambda i: i.description,
+    'department': lambda i: i.department,
+    'location': lambda i: i.location,
+    'employer_id': lambda i: i.employer_id,
+    'skills': lambda i: [skill.name for skill in i.required_skills],
+    'created_at': lambda i: _iso(i.created_at),
+    'updated_at': lambda i: _iso(i.updated_at),
+}
+
+APPLICATION_FIELDS = {
+    'id': lambda a: a.id,
+    'internship_id': lambda a: a.internship_id,
+    'internship_title': lambda a: a.internship.title,
+    'applied_at': lambda a: _iso(a.applied_at),
+    'quiz_score': lambda a: a.quiz_score,
+    'quiz_passed': lambda a: a.quiz_passed,
+}
+
+APPLICANT_FIELDS = {
+    'id': lambda a: a.id,
+    'student_id': lambda a: a.student_id,
+    'full_name': lambda a: a.student.full_name,
+    'email': lambda a: a.student.email,
+    'department': lambda a: a.student.department,
+    'skills': lambda a: [skill.name for skill in a.student.skills],
+    'applied_at': lambda a: _iso(a.applied_at),
+    'quiz_score': lambda a: a.quiz_score,
+    'quiz_passed': lambda a: a.quiz_passed,
+}
+
+
+def selected_fields(available):
+    """The ?fields=a,b subset of `available`, in request order; every field by default"""
+    value = request.args.get('fields')
+    if not value:
+        return list(available)
+    fields = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        abort(400, f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}.")
+    return fields
+
+
+def serialize(row, fields, available):
+    return {name: available[name](row) for name in fields}
+
+
+def skill_loading(fields, relationship):
+    """Skip the selectin skill query when the client did not ask for skills"""
+    return [] if 'skills' in fields else [lazyload(relationship)]
+
+
+def page_kwargs():
+    return {
+        'per_page': page_size(request.args.get('per_page', type=int)),
+        'after': request.args.get('after'),
+        'before': request.args.get('before'),
+    }
+
+
+def page_response(page, data):
+    return jsonify(data=data, next=page.next_cursor, prev=page.prev_cursor)
+
+
+# --------------------------
+# Authentication: the same session cookie as the site
+# --------------------------
+def current_user(role=None):
+    user_id = session.get('user_id')
+    if not user_id:
+        abort(401, "Sign in first.")
+    if role and session.get('role') != role:
+        abort(403, f"Only available to {role}s.")
+    return user_id
+
+
+@api.errorhandler(HTTPException)
+def http_error(error):
+    return jsonify(error=error.description), error.code
+
+
+# --------------------------
+# Internships
+# --------------------------
+def internships_version():
+    if not session.get('user_id'):
+        return None
+    row = db.session.query(row_count(Internship), db.func.max(Internship.updated_at)).one()
+    return tuple(row), row[1]
+
+
+@api.route('/internships')
+@query_budget(3)
+@conditional(internships_version, shows_flashes=False)
+def internships():
+    """Newest first, or ranked full-text results with ?q="""
+    current_user()
+    fields = selected_fields(INTERNSHIP_FIELDS)
+    q = request.args.get('q', '').strip()
+    if q:
+        page = search_internships(q, **page_kwargs())
+    else:
+        page = paginate(
+            Internship.query.options(*skill_loading(fields, Internship.required_skills)),
+            order_by=[Internship.created_at, Internship.id],
+            key=lambda internship: (internship.created_at, internship.id),
+            **page_kwargs(),
+        )
+    return page_response(page, [serialize(internship, fields, INTERNSHIP_FIELDS) for internship in page.items])
+
+
+@api.route('/internships/<int:id>')
+@query_budget(2)
+def internship(id):
+    current_user()
+    fields = selected_fields(INTERNSHIP_FIELDS)
+    internship = (Internship.query.options(*skill_loading(fields, Internship.required_skills))
+                  .filter_by(id=id).first_or_404("No such internship."))
+    return jsonify(data=serialize(internship, fields, INTERNSHIP_FIELDS))
+
+
+@api.route('/internships/<int:id>/applicants')
+@query_budget(4)
+@conditional(applicants_version, shows_flashes=False)
+def applicants(id):
+    """Applicants of one of the employer's internships, oldest first within a page, with the counters"""
+    employer_id = current_user('employer')
+    internship = Internship.query.options(lazyload(Internship.required_skills)).get_or_404(id, "No such internship.")
+    if internship.employer_id != employer_id:
+        abort(403, "Not your internship.")
+    fields = selected_fields(APPLICANT_FIELDS)
+    page = paginate(
+        Application.query.options(joinedload(Application.student).options(
+            *skill_loading(fields, Profile.skills))).filter_by(internship_id=id),
+        order_by=[Application.applied_at, Application.id],
+        key=lambda app: (app.applied_at, app.id),
+        **page_kwargs(),
+    )
+    return jsonify(
+        data=[serialize(app, fields, APPLICANT_FIELDS) for app in page.items],
+        next=page.next_cursor,
+        prev=page.prev_cursor,
+        stats={
+            'applicant_count': internship.applicant_count,
+            'passed_count': internship.passed_count,
+            'failed_count': internship.failed_count,
+            'average_score': internship.average_score,
+        },
+    )
+
+
+# --------------------------
+# The signed-in student
+# --------------------------
+@api.route('/me/matches')
+@query_budget(5)
+@conditional(student_dashboard_version, shows_flashes=False)
+def matches():
+    """Internships sharing skills with the student, best match first, with the number shared"""
+    student_id = current_user('student')
+    fields = selected_fields(INTERNSHIP_FIELDS)
+    student = db.session.get(Profile, student_id)
+    if student is None:
+        abort(401, "Your account no longer exists.")
+    page = match_internships(student, **page_kwargs())
+    return page_response(page, [dict(serialize(internship, fields, INTERNSHIP_FIELDS), score=score)
+                                for internship, score in page.items])
+
+
+@api.route('/me/recommendations')
+@query_budget(3)
+@conditional(student_dashboard_version, shows_flashes=False)
+def recommendations():
+    """Precomputed recommendations the student has not applied to yet"""
+    student_id = current_user('student')
+    fields = selected_fields(INTERNSHIP_FIELDS)
+    limit = max(1, min(request.args.get('limit', 6, type=int), MAX_PER_PAGE))
+    return jsonify(data=[dict(serialize(internship, fields, INTERNSHIP_FIELDS), score=round(score, 4))
+                         for internship, score in recommended_internships(student_id, limit=limit)])
+
+
+@api.route('/me/applications')
+@query_budget(2)
+@conditional(student_dashboard_version, shows_flashes=False)
+def applications():
+    student_id = current_user('student')
+    fields = selected_fields(APPLICATION_FIELDS)
+    page = paginate(
+        Application.query.options(joinedload(Application.internship).options(lazyload(Internship.required_skills)))
+        .filter_by(student_id=student_id),
+        order_by=[Application.applied_at, Application.id],
+        key=lambda app: (app.applied_at, app.id),
+        **page_kwargs(),
+    )
+    return page_response(page, [serialize(app, fields, APPLICATION_FIELDS) for app in page.items])
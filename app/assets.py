@@ -0,0 +1,222 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+
+import click
+from flask import current_app, request, send_from_directory, url_for
+from flask.cli import AppGroup
+
+logger = logging.getLogger(__name__)
+
+assets_cli = AppGroup('assets', help="Build the fingerprinted CSS and JS bundles.")
+
+SOURCE_DIR = os.path.join(os.path.dirname(__file__), 'assets')
+
+# Bundle name -> source files under app/assets, in order. Files named *.min.* are
+# taken as they are; other CSS is minified. JavaScript is only concatenated.
+BUNDLES = {
+    'app.css': [
+        'vendor/bootstrap/bootstrap.min.css',
+        'vendor/bootstrap-icons/bootstrap-icons.min.css',
+        'css/base.css',
+    ],
+    'app.js': [
+        'vendor/bootstrap/popper.min.js',
+        'vendor/bootstrap/bootstrap.min.js',
+    ],
+}
+
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+_SOURCE_MAP = re.compile(r'/[*/]# sourceMappingURL=\S+(?: \*/)?')
+_CHARSET = re.compile(r'@charset "[^"]*";')
+
+
+def minify_css(text):
+    """Drop comments (keeping /*! licence */ ones) and insignificant whitespace"""
+    text = re.sub(r'/\*(?!!).*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+
+def _fingerprint(name, data):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}'
+
+
+class AssetBuilder:
+    """Writes every bundle, and the files its CSS points at, to `output_dir` under content-hashed names"""
+
+    def __init__(self, output_dir, source_dir=SOURCE_DIR, bundles=BUNDLES):
+        self.output_dir = output_dir
+        self.source_dir = source_dir
+        self.bundles = bundles
+
+    def _write(self, name, data):
+        path = os.path.join(self.output_dir, name)
+        if not os.path.exists(path):
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)  # concurrent builders never serve a half-written file
+        if name.endswith(('.css', '.js', '.svg')) and not os.path.exists(path + '.gz'):
+            tmp = f'{path}.gz.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            os.replace(tmp, path + '.gz')
+        return name
+
+    def _rewrite_urls(self, css, source):
+        """Copy fonts and images a stylesheet refers to and point it at their fingerprinted names"""
+        def replace(match):
+            url = match.group(2)
+            if url.startswith(('data:', 'http:', 'https:', '/', '#')):
+                return match.group(0)
+            path, _, fragment = url.partition('#')
+            path = path.split('?', 1)[0]
+            with open(os.path.join(os.path.dirname(source), path), 'rb') as f:
+                data = f.read()
+            name = self._write(_fingerprint(posixpath.basename(path), data), data)
+            return f'url("{name}{"#" + fragment if fragment else ""}")'
+        return _CSS_URL.sub(replace, css)
+
+    def _bundle(self, name, sources):
+        parts = []
+        for source in sources:
+            path = os.path.join(self.source_dir, source)
+            with open(path, encoding='utf-8') as f:
+                text = _SOURCE_MAP.sub('', f.read()).strip()  # the maps are not shipped
+            if name.endswith('.css'):
+                text = _CHARSET.sub('', text)
+                if '.min.' not in source:
+                    text = minify_css(text)
+                text = self._rewrite_urls(text, path)
+            parts.append(text)
+        if name.endswith('.css'):
+            return ('@charset "UTF-8";' + '\n'.join(parts)).encode()
+        return ';\n'.join(parts).encode()
+
+    def build(self):
+        """Build every bundle and write manifest.json; returns the manifest"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = {}
+        for name, sources in self.bundles.items():
+            data = self._bundle(name, sources)
+            manifest[name] = self._write(_fingerprint(name, data), data)
+        tmp = os.path.join(self.output_dir, f'manifest.json.{os.getpid()}.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, os.path.join(self.output_dir, 'manifest.json'))
+        return manifest
+
+    def clean(self, keep):
+        """Delete built files not referenced by the `keep` manifests (or their stylesheets)"""
+        referenced = {'manifest.json'}
+        for manifest in keep:
+            for name in manifest.values():
+                referenced.add(name)
+                if name.endswith('.css'):
+                    with open(os.path.join(self.output_dir, name), encoding='utf-8') as f:
+                        referenced.update(m.group(2).partition('#')[0] for m in _CSS_URL.finditer(f.read()))
+        removed = 0
+        for name in os.listdir(self.output_dir):
+            if name.removesuffix('.gz') not in referenced:
+                os.remove(os.path.join(self.output_dir, name))
+                removed += 1
+        return removed
+
+
+class Assets:
+    """Resolves bundle names to their fingerprinted URLs and serves them with immutable caching.
+
+    Built files live in app/static/dist. The manifest is built on first use
+    when missing, and rebuilt in debug mode when a source is newer than it.
+    """
+
+    def __init__(self):
+        self._manifest = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('ASSETS_OUTPUT_DIR', os.path.join(app.static_folder, 'dist'))
+        app.config.setdefault('ASSETS_AUTO_BUILD', True)
+        app.config.setdefault('ASSETS_MAX_AGE', 365 * 24 * 3600)
+        self.builder = AssetBuilder(app.config['ASSETS_OUTPUT_DIR'])
+        self._manifest = None
+        # Registered on the app so it wins over the generic /static/<path> rule
+        app.add_url_rule(app.static_url_path + '/dist/<path:filename>', endpoint='assets', view_func=self.send)
+        app.jinja_env.globals['asset_url'] = self.url
+
+    def _manifest_path(self):
+        return os.path.join(self.builder.output_dir, 'manifest.json')
+
+    def _sources_newer_than(self, mtime):
+        return any(os.path.getmtime(os.path.join(self.builder.source_dir, source)) > mtime
+                   for sources in self.builder.bundles.values() for source in sources)
+
+    def manifest(self):
+        with self._lock:
+            if self._manifest is not None and not current_app.debug:
+                return self._manifest
+            path = self._manifest_path()
+            if current_app.config['ASSETS_AUTO_BUILD'] and (
+                    not os.path.exists(path)
+                    or current_app.debug and self._sources_newer_than(os.path.getmtime(path))):
+                logger.info("Building static assets into %s", self.builder.output_dir)
+                self.builder.build()
+            if self._manifest is None or os.path.getmtime(path) != self._mtime:
+                with open(path) as f:
+                    self._manifest = json.load(f)
+                self._mtime = os.path.getmtime(path)
+            return self._manifest
+
+    def url(self, name):
+        """URL of a bundle, e.g. asset_url('app.css') -> /static/dist/app.3f2a9c01de.css"""
+        return url_for('assets', filename=self.manifest()[name])
+
+    def version(self):
+        """Digest of the manifest, changes whenever any bundle does"""
+        return hashlib.sha1(json.dumps(self.manifest(), sort_keys=True).encode()).hexdigest()[:12]
+
+    def send(self, filename):
+        directory = self.builder.output_dir
+        # The name changes with the content, so a copy never needs revalidating
+        max_age = current_app.config['ASSETS_MAX_AGE']
+        if request.accept_encodings.quality('gzip') and os.path.isfile(os.path.join(directory, filename + '.gz')):
+            response = send_from_directory(directory, filename + '.gz', mimetype=mimetypes.guess_type(filename)[0],
+                                           max_age=max_age)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = send_from_directory(directory, filename, max_age=max_age)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.immutable = True
+        return response
+
+assets = Assets()
+
+
+@assets_cli.command('build')
+@click.option('--clean', is_flag=True, help="Delete files from builds older than the previous one.")
+def build_command(clean):
+    """Bundle, minify and fingerprint the CSS and JS into app/static/dist."""
+    builder = assets.builder
+    previous = None
+    if os.path.exists(assets._manifest_path()):
+        with open(assets._manifest_path()) as f:
+            previous = json.load(f)
+    manifest = builder.build()
+    for name, filename in sorted(manifest.items()):
+        size = os.path.getsize(os.path.join(builder.output_dir, filename))
+        click.echo(f"{name:8} -> {filename} ({size // 1024} KiB)")
+    if clean:
+        # The previous build stays, pages rendered before a deploy may still ask for it
+        removed = builder.clean([manifest] + ([previous] if previous else []))
+        click.echo(f"Removed {removed} old files.")
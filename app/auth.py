@@ -0,0 +1,150 @@
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from .models import db, Profile
+
+DEFAULT_HASH_METHOD = 'scrypt:32768:8:1'  # werkzeug's scrypt:N:r:p
+
+
+def hash_method():
+    return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD)
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=hash_method())
+
+
+def needs_rehash(password_hash):
+    """True when a stored hash was made with other cost parameters than PASSWORD_HASH_METHOD"""
+    return password_hash.split('$', 1)[0] != hash_method()
+
+
+# Password reset links, also how accounts without a stored hash get a password
+def _reset_serializer():
+    return URLSafeTimedSerializer(current_app.secret_key, salt='password-reset')
+
+
+def _hash_fingerprint(profile):
+    # Changes with the password, so a link stops working once it has been used
+    return hashlib.sha256((profile.password_hash or '').encode()).hexdigest()[:16]
+
+
+def reset_token(profile):
+    return _reset_serializer().dumps([profile.id, _hash_fingerprint(profile)])
+
+
+def load_reset_token(token):
+    """The Profile a reset token was made for, or None if it is invalid, expired or already used"""
+    try:
+        profile_id, fingerprint = _reset_serializer().loads(
+            token or '', max_age=current_app.config.get('PASSWORD_RESET_MAX_AGE', 3600)
+        )
+    except (BadSignature, ValueError, TypeError):
+        return None
+    profile = db.session.get(Profile, profile_id)
+    if profile is None or not hmac.compare_digest(fingerprint, _hash_fingerprint(profile)):
+        return None
+    return profile
+
+
+class _BoundedDict:
+    """Thread-safe LRU dict with per-entry expiry"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return default
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class LoginGuard:
+    """Per-process login cache that keeps scrypt off the hot path.
+
+    Negative side: failures are counted per email and per client address,
+    and once either reaches its limit further attempts are refused before
+    any hash is computed, until LOGIN_FAILURE_WINDOW seconds pass without
+    another failure. Positive side:
+    a successful check is remembered for LOGIN_CACHE_TTL seconds under an
+    HMAC of the credentials, so a user signing in again skips scrypt as long
+    as the stored hash has not changed.
+    """
+
+    def __init__(self):
+        self._failures = _BoundedDict(10000)
+        self._verified = _BoundedDict(10000)
+
+    def init_app(self, app):
+        app.config.setdefault('LOGIN_MAX_FAILURES', 5)
+        app.config.setdefault('LOGIN_MAX_FAILURES_PER_IP', 50)
+        app.config.setdefault('LOGIN_FAILURE_WINDOW', 300)
+        app.config.setdefault('LOGIN_CACHE_TTL', 300)
+        size = app.config.setdefault('LOGIN_CACHE_SIZE', 10000)
+        self._failures.max_size = self._verified.max_size = size
+
+    def _limits(self, email, address):
+        config = current_app.config
+        return ((f'email:{email}', config['LOGIN_MAX_FAILURES']),
+                (f'ip:{address}', config['LOGIN_MAX_FAILURES_PER_IP']))
+
+    def is_blocked(self, email, address):
+        return any(self._failures.get(key, 0) >= limit for key, limit in self._limits(email, address))
+
+    def record_failure(self, email, address):
+        window = current_app.config['LOGIN_FAILURE_WINDOW']
+        for key, _ in self._limits(email, address):
+            self._failures.set(key, self._failures.get(key, 0) + 1, window)
+
+    def record_success(self, email):
+        self._failures.pop(f'email:{email}')
+
+    def _credential_key(self, email, password):
+        secret = current_app.secret_key.encode() if isinstance(current_app.secret_key, str) else current_app.secret_key
+        return hmac.new(secret, f'{email}\0{password}'.encode(), hashlib.sha256).hexdigest()
+
+    def check(self, profile, password):
+        """Verify a password against a profile, rehashing it if the cost parameters changed"""
+        key = self._credential_key(profile.email, password)
+        if profile.password_hash and self._verified.get(key) == profile.password_hash:
+            return True
+        if not profile.password_hash or not check_password_hash(profile.password_hash, password):
+            return False
+        if needs_rehash(profile.password_hash):
+            profile.password_hash = hash_password(password)
+            db.session.commit()
+        self._verified.set(key, profile.password_hash, current_app.config['LOGIN_CACHE_TTL'])
+        return True
+
+    def clear(self):
+        self._failures.clear()
+        self._verified.clear()
+
+
+login_guard = LoginGuard()
@@ -0,0 +1,365 @@
+import csv
+import json
+import os
+from datetime import datetime, timedelta
+from itertools import islice
+
+import click
+from flask.cli import AppGroup
+
+from .counters import adjust_row_count
+from .fragments import fragments
+from .jobs import enqueue
+from .matching import get_or_create_skills, normalize_skill
+from .models import (db, Profile, Internship, Application, Recommendation, TechnicalQuestion, internship_skill,
+                     profile_skill)
+from .quizbank import quiz_banks
+from .search import index_internships, remove_internships
+
+bulk_cli = AppGroup('bulk', help="Bulk import and export of profiles, internships and questions, and purging.")
+
+DEFAULT_BATCH_SIZE = 1000
+
+FIELDS = {
+    'profiles': ['role', 'full_name', 'email', 'department', 'company_name', 'skills'],
+    'internships': ['employer_email', 'title', 'description', 'department', 'location', 'skills'],
+    'questions': ['internship_id', 'question', 'answer', 'notes'],
+}
+
+
+# --------------------------
+# Reading and writing
+# --------------------------
+def _guess_format(name, fmt):
+    if fmt:
+        return fmt
+    return 'jsonl' if os.path.splitext(name or '')[1].lower() in ('.jsonl', '.json', '.ndjson') else 'csv'
+
+
+def _read_rows(source, fmt):
+    """Yield (line_number, dict) without loading the whole file"""
+    if fmt == 'csv':
+        reader = csv.DictReader(source)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"invalid JSON: {e}")
+            continue
+        yield line_number, row if isinstance(row, dict) else ValueError("expected a JSON object")
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _skill_list(value):
+    if isinstance(value, list):
+        return [str(s) for s in value]
+    return [s for s in (value or '').split(',') if s.strip()]
+
+
+def _text(row, field, required=False, max_length=None):
+    value = row.get(field)
+    value = str(value).strip() if value is not None else ''
+    if required and not value:
+        raise ValueError(f"{field} is required")
+    if max_length and len(value) > max_length:
+        raise ValueError(f"{field} is longer than {max_length} characters")
+    return value or None
+
+
+# --------------------------
+# Validation, one row at a time and without touching the database
+# --------------------------
+def _validate_profile(row):
+    role = _text(row, 'role', required=True)
+    if role not in ('student', 'employer'):
+        raise ValueError("role must be 'student' or 'employer'")
+    return {
+        'role': role,
+        'full_name': _text(row, 'full_name', required=True, max_length=100),
+        'email': _text(row, 'email', required=True, max_length=120),
+        'department': _text(row, 'department', max_length=100),
+        'company_name': _text(row, 'company_name', max_length=100),
+        'skills': _skill_list(row.get('skills')),
+    }
+
+
+def _validate_internship(row):
+    return {
+        'employer_email': _text(row, 'employer_email', required=True),
+        'title': _text(row, 'title', required=True, max_length=100),
+        'description': _text(row, 'description'),
+        'department': _text(row, 'department', max_length=100),
+        'location': _text(row, 'location', max_length=100),
+        'skills': _skill_list(row.get('skills')),
+    }
+
+
+def _validate_question(row):
+    try:
+        internship_id = int(row.get('internship_id'))
+    except (TypeError, ValueError):
+        raise ValueError("internship_id must be an integer")
+    answer = row.get('answer')
+    if not isinstance(answer, bool):
+        answer = str(answer or '').strip().lower()
+        if answer not in ('yes', 'no', 'true', 'false', '1', '0'):
+            raise ValueError("answer must be yes or no")
+        answer = answer in ('yes', 'true', '1')
+    return {
+        'internship_id': internship_id,
+        'question': _text(row, 'question', required=True),
+        'correct_answer': answer,
+        'notes': _text(row, 'notes') or '',
+    }
+
+
+# --------------------------
+# Batched inserts, each returns (inserted, [(line_number, error), ...])
+# --------------------------
+def _insert_returning_ids(model, rows):
+    statement = db.insert(model).returning(model.id, sort_by_parameter_order=True)
+    return db.session.scalars(statement, rows).all()
+
+
+def _link_skills(table, owner_column, owner_ids, skill_lists):
+    skills = {skill.key: skill for skill in get_or_create_skills([name for names in skill_lists for name in names])}
+    db.session.flush()
+    links = []
+    for owner_id, names in zip(owner_ids, skill_lists):
+        keys = {normalize_skill(name) for name in names} - {''}
+        links.extend({owner_column: owner_id, 'skill_id': skills[key].id} for key in keys)
+    if links:
+        db.session.execute(table.insert(), links)
+
+
+def _import_profiles(rows):
+    emails = {row['email'] for _, row in rows}
+    taken = {email for (email,) in db.session.query(Profile.email).filter(Profile.email.in_(emails))}
+    accepted, rejected = [], []
+    for line_number, row in rows:
+        if row['email'] in taken:
+            rejected.append((line_number, f"email {row['email']} already exists"))
+            continue
+        taken.add(row['email'])
+        accepted.append(row)
+    if not accepted:
+        return 0, rejected
+
+    ids = _insert_returning_ids(Profile, [{k: v for k, v in row.items() if k != 'skills'} for row in accepted])
+    _link_skills(profile_skill, 'profile_id', ids, [row['skills'] for row in accepted])
+    return len(ids), rejected
+
+
+def _import_internships(rows):
+    emails = {row['employer_email'] for _, row in rows}
+    employers = dict(db.session.query(Profile.email, Profile.id)
+                     .filter(Profile.email.in_(emails), Profile.role == 'employer'))
+    accepted, rejected = [], []
+    for line_number, row in rows:
+        employer_id = employers.get(row['employer_email'])
+        if employer_id is None:
+            rejected.append((line_number, f"no employer with email {row['employer_email']}"))
+            continue
+        accepted.append(dict(row, employer_id=employer_id))
+    if not accepted:
+        return 0, rejected
+
+    columns = ('employer_id', 'title', 'description', 'department', 'location')
+    ids = _insert_returning_ids(Internship, [{k: row[k] for k in columns} for row in accepted])
+    adjust_row_count(Internship, len(ids))
+    _link_skills(internship_skill, 'internship_id', ids, [row['skills'] for row in accepted])
+    index_internships(ids)
+    return len(ids), rejected
+
+
+def _import_questions(rows):
+    internship_ids = {row['internship_id'] for _, row in rows}
+    known = {id for (id,) in db.session.query(Internship.id).filter(Internship.id.in_(internship_ids))}
+    accepted, rejected = [], []
+    for line_number, row in rows:
+        if row['internship_id'] not in known:
+            rejected.append((line_number, f"no internship with id {row['internship_id']}"))
+            continue
+        accepted.append(row)
+    if accepted:
+        db.session.execute(db.insert(TechnicalQuestion), accepted)
+    return len(accepted), rejected
+
+
+IMPORTERS = {
+    'profiles': (_validate_profile, _import_profiles),
+    'internships': (_validate_internship, _import_internships),
+    'questions': (_validate_question, _import_questions),
+}
+
+
+# --------------------------
+# Streaming export, rows are read with yield_per so memory stays flat
+# --------------------------
+def _internship_row(internship, employer_email):
+    return {
+        'employer_email': employer_email, 'title': internship.title,
+        'description': internship.description, 'department': internship.department,
+        'location': internship.location,
+        'skills': [skill.name for skill in internship.required_skills],
+    }
+
+
+def _export_rows(kind, batch_size):
+    if kind == 'profiles':
+        query = Profile.query.order_by(Profile.id)
+        for profile in query.yield_per(batch_size):
+            yield {
+                'role': profile.role, 'full_name': profile.full_name, 'email': profile.email,
+                'department': profile.department, 'company_name': profile.company_name,
+                'skills': [skill.name for skill in profile.skills],
+            }
+    elif kind == 'internships':
+        query = db.session.query(Internship, Profile.email).join(Internship.employer).order_by(Internship.id)
+        for internship, employer_email in query.yield_per(batch_size):
+            yield _internship_row(internship, employer_email)
+    else:
+        query = (db.session.query(TechnicalQuestion.internship_id, TechnicalQuestion.question,
+                                  TechnicalQuestion.correct_answer, TechnicalQuestion.notes)
+                 .order_by(TechnicalQuestion.id))
+        for internship_id, question, correct_answer, notes in query.yield_per(batch_size):
+            yield {
+                'internship_id': internship_id, 'question': question,
+                'answer': 'yes' if correct_answer else 'no', 'notes': notes,
+            }
+
+
+# --------------------------
+# Purging stale postings, batch_size internships per transaction
+# --------------------------
+def stale_internships(days):
+    """Internships posted more than `days` ago that received no application since"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    recent = db.select(Application.id).where(Application.internship_id == Internship.id,
+                                              Application.applied_at >= cutoff)
+    return db.select(Internship.id).where(Internship.created_at < cutoff, ~recent.exists())
+
+
+def purge_internships(days, batch_size=DEFAULT_BATCH_SIZE, archive=None):
+    """Delete stale internships with everything hanging off them; returns how many were deleted.
+
+    Questions, applications, recommendations and rollups go with ON DELETE
+    CASCADE, so a batch is a handful of statements whatever its size. With
+    `archive`, a writable file, each posting is first written there as a
+    JSON line in `bulk import internships` format.
+    """
+    candidates = stale_internships(days)
+    purged = last_id = 0
+    while True:
+        ids = db.session.scalars(candidates.where(Internship.id > last_id).order_by(Internship.id)
+                                 .limit(batch_size)).all()
+        if not ids:
+            break
+        if archive is not None:
+            query = (db.session.query(Internship, Profile.email).join(Internship.employer)
+                     .filter(Internship.id.in_(ids)).order_by(Internship.id))
+            for internship, employer_email in query:
+                archive.write(json.dumps(_internship_row(internship, employer_email),
+                                         ensure_ascii=False, separators=(',', ':')) + '\n')
+        # Students who had them recommended get replacements once the worker catches up
+        listed = db.session.scalars(db.select(Recommendation.student_id).distinct()
+                                    .where(Recommendation.internship_id.in_(ids))).all()
+        if listed:
+            enqueue('refresh_recommendations', {'student_ids': listed})
+        remove_internships(ids)
+        result = db.session.execute(db.delete(Internship).where(Internship.id.in_(ids)))
+        adjust_row_count(Internship, -result.rowcount)
+        db.session.commit()
+        for id in ids:
+            quiz_banks.invalidate(id)
+        fragments.invalidate('internship', ids)
+        purged += len(ids)
+        last_id = ids[-1]
+    return purged
+
+
+# --------------------------
+# Commands
+# --------------------------
+@bulk_cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(FIELDS)))
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help="Defaults to the file extension.")
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True, help="Rows per transaction.")
+def import_command(kind, source, fmt, batch_size):
+    """Import KIND rows from SOURCE (a path, or - for stdin)."""
+    validate, insert = IMPORTERS[kind]
+    imported = rejected = 0
+    for batch in _batches(_read_rows(source, _guess_format(source.name, fmt)), batch_size):
+        valid, errors = [], []
+        for line_number, row in batch:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                valid.append((line_number, validate(row)))
+            except ValueError as e:
+                errors.append((line_number, str(e)))
+
+        try:
+            count, db_errors = insert(valid) if valid else (0, [])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        imported += count
+        for line_number, error in sorted(errors + db_errors):
+            click.echo(f"{source.name}:{line_number}: {error}", err=True)
+            rejected += 1
+
+    click.echo(f"Imported {imported} {kind}, rejected {rejected}.")
+
+
+@bulk_cli.command('export')
+@click.argument('kind', type=click.Choice(sorted(FIELDS)))
+@click.argument('target', type=click.File('w', encoding='utf-8', lazy=True), default='-')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help="Defaults to the file extension.")
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True, help="Rows fetched per round trip.")
+def export_command(kind, target, fmt, batch_size):
+    """Export KIND rows to TARGET (a path, or - for stdout) in import format."""
+    fmt = _guess_format(target.name, fmt)
+    rows = _export_rows(kind, batch_size)
+    if fmt == 'csv':
+        writer = csv.DictWriter(target, fieldnames=FIELDS[kind])
+        writer.writeheader()
+        for row in rows:
+            if 'skills' in row:
+                row['skills'] = ', '.join(row['skills'])
+            writer.writerow(row)
+    else:
+        for row in rows:
+            target.write(json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+
+@bulk_cli.command('purge')
+@click.option('--days', default=365, show_default=True,
+              help="Delete internships older than this that had no application in as long.")
+@click.option('--archive', type=click.File('a', encoding='utf-8', lazy=True),
+              help="Append the deleted postings to this JSONL file first, in import format.")
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True, help="Internships per transaction.")
+@click.option('--dry-run', is_flag=True, help="Only count the internships that would go.")
+def purge_command(days, archive, batch_size, dry_run):
+    """Delete stale internships with their questions, applications and recommendations."""
+    if dry_run:
+        count = db.session.scalar(db.select(db.func.count()).select_from(stale_internships(days).subquery()))
+        click.echo(f"{count} internships would be purged.")
+        return
+    purged = purge_internships(days, batch_size, archive)
+    click.echo(f"Purged {purged} internships.")
@@ -0,0 +1,118 @@
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from .models import db
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _database_url():
+    url = os.environ.get('DATABASE_URL', 'sqlite:///marketplace.db')
+    # Heroku-style URLs use the scheme SQLAlchemy dropped in 1.4
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def config_from_env():
+    """App config read from the environment (and .env, which the flask CLI loads)"""
+    return {
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'secret'),
+        'SQLALCHEMY_DATABASE_URI': _database_url(),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        # werkzeug method string, scrypt:N:r:p; stored hashes are upgraded on the next sign-in
+        'PASSWORD_HASH_METHOD': os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1'),
+        # Links in outgoing mail are built on this, never on the request's Host header, e.g. https://carreerbridge.example
+        'APP_BASE_URL': os.environ.get('APP_BASE_URL'),
+        # Reverse proxies in front of the app (nginx: 1); their X-Forwarded-For/-Proto are trusted that many hops deep
+        'PROXY_FIX_HOPS': _env_int('PROXY_FIX_HOPS', 0),
+        # Connection pool, ignored for SQLite
+        'DB_POOL_SIZE': _env_int('DB_POOL_SIZE', 10),
+        'DB_MAX_OVERFLOW': _env_int('DB_MAX_OVERFLOW', 20),
+        'DB_POOL_TIMEOUT': _env_int('DB_POOL_TIMEOUT', 30),
+        'DB_POOL_RECYCLE': _env_int('DB_POOL_RECYCLE', 1800),
+        'DB_POOL_PRE_PING': _env_bool('DB_POOL_PRE_PING', True),
+        # SQLite only
+        'SQLITE_BUSY_TIMEOUT': _env_int('SQLITE_BUSY_TIMEOUT', 5000),  # milliseconds
+        'SQLITE_WAL': _env_bool('SQLITE_WAL', True),
+        # Instrumentation, /metrics always serves the cache counters
+        'METRICS_ENABLED': _env_bool('METRICS_ENABLED', False),
+        'SLOW_QUERY_MS': _env_int('SLOW_QUERY_MS', 100),
+        'SLOW_REQUEST_MS': _env_int('SLOW_REQUEST_MS', 1000),
+        # Outgoing mail for background jobs, messages are only logged without MAIL_SERVER
+        'MAIL_SERVER': os.environ.get('MAIL_SERVER'),
+        'MAIL_PORT': _env_int('MAIL_PORT', 25),
+        'MAIL_USE_TLS': _env_bool('MAIL_USE_TLS', False),
+        'MAIL_USERNAME': os.environ.get('MAIL_USERNAME'),
+        'MAIL_PASSWORD': os.environ.get('MAIL_PASSWORD'),
+        'MAIL_SENDER': os.environ.get('MAIL_SENDER', 'no-reply@carreerbridge.local'),
+    }
+
+
+def is_sqlite(config):
+    return make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name() == 'sqlite'
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured backend"""
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if is_sqlite(config):
+        # Python's sqlite3 waits this long (seconds) on a locked database before raising
+        options.setdefault('connect_args', {}).setdefault('timeout', config['SQLITE_BUSY_TIMEOUT'] / 1000)
+        return options
+    options.setdefault('pool_size', config['DB_POOL_SIZE'])
+    options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+    options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+    options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+    options.setdefault('pool_pre_ping', config['DB_POOL_PRE_PING'])
+    return options
+
+
+def dispose_engines(app):
+    """Forget pooled connections inherited from a parent process, without closing them.
+
+    Call in each worker right after fork (gunicorn's post_fork). The parent
+    keeps using its sockets, the worker opens its own on first use.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def init_sqlite_pragmas(app):
+    """Per-connection pragmas so concurrent workers don't serialize on the SQLite file lock.
+
+    WAL lets readers run alongside the single writer, busy_timeout makes a
+    blocked writer wait instead of failing with "database is locked".
+    foreign_keys turns on the ON DELETE CASCADE rules, SQLite ignores them
+    by default.
+    """
+    if not is_sqlite(app.config):
+        return
+    busy_timeout = app.config['SQLITE_BUSY_TIMEOUT']
+    wal = app.config['SQLITE_WAL']
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if wal:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout)}')
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.close()
+
+    with app.app_context():
+        event.listen(db.engine, 'connect', set_pragmas)
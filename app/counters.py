@@ -0,0 +1,129 @@
+import click
+from flask.cli import AppGroup
+
+from .models import db, Application, Internship, RowCount
+
+counters_cli = AppGroup('counters', help="Maintain the denormalized applicant and row counters.")
+COUNTED = (Internship,)  # tables whose row count is kept in RowCount
+
+
+def record_application(application):
+    """Bump the internship's counters for a new application, in the caller's transaction.
+
+    A single UPDATE ... SET x = x + 1, so concurrent submissions never lose
+    an increment.
+    """
+    passed = 1 if application.quiz_passed else 0
+    db.session.execute(
+        db.update(Internship)
+        .where(Internship.id == application.internship_id)
+        .values(
+            applicant_count=Internship.applicant_count + 1,
+            passed_count=Internship.passed_count + passed,
+            score_total=Internship.score_total + (application.quiz_score or 0),
+            updated_at=Internship.updated_at,  # not a content change, keep the onupdate off
+        )
+    )
+
+
+def _counter_values(*criteria):
+    """Correlated subqueries recomputing every counter from the application table, or its rows matching criteria"""
+    return {
+        'applicant_count': (db.select(db.func.count(Application.id))
+                            .where(Application.internship_id == Internship.id, *criteria).scalar_subquery()),
+        'passed_count': (db.select(db.func.count(Application.id))
+                         .where(Application.internship_id == Internship.id, Application.quiz_passed == True,  # noqa: E712
+                                *criteria)
+                         .scalar_subquery()),
+        'score_total': (db.select(db.func.coalesce(db.func.sum(Application.quiz_score), 0))
+                        .where(Application.internship_id == Internship.id, *criteria).scalar_subquery()),
+    }
+
+
+def discount_applications(*criteria):
+    """Take the applications matching criteria off their internships' counters, in the caller's transaction.
+
+    Call right before deleting them in bulk (e.g. with their student), the
+    database cascade does not go through record_application's bookkeeping.
+    """
+    values = _counter_values(*criteria)
+    db.session.execute(
+        db.update(Internship)
+        .where(Internship.id.in_(db.select(Application.internship_id).where(*criteria)))
+        .values(updated_at=Internship.updated_at,
+                **{name: getattr(Internship, name) - value for name, value in values.items()})
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reconcile_counters(batch_size=5000):
+    """Recompute the counters for every internship, batch_size ids per transaction.
+
+    Returns the number of internships whose stored counters were wrong.
+    """
+    values = _counter_values()
+    stale = db.or_(*(getattr(Internship, name) != value for name, value in values.items()))
+    fixed = last_id = 0
+    while True:
+        ids = [id for (id,) in db.session.query(Internship.id)
+               .filter(Internship.id > last_id).order_by(Internship.id).limit(batch_size)]
+        if not ids:
+            break
+        result = db.session.execute(
+            db.update(Internship)
+            .where(Internship.id.between(ids[0], ids[-1]), stale)
+            .values(updated_at=Internship.updated_at, **values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        fixed += result.rowcount
+        last_id = ids[-1]
+    return fixed
+
+
+# --------------------------
+# Table row counts
+# --------------------------
+def adjust_row_count(model, delta):
+    """Add delta to the model's stored row count, in the caller's transaction, after the rows were written"""
+    if not delta:
+        return
+    name = model.__tablename__
+    result = db.session.execute(db.update(RowCount).where(RowCount.name == name).values(rows=RowCount.rows + delta))
+    if not result.rowcount:
+        # First write since the table was created outside the migrations, count once
+        db.session.add(RowCount(name=name, rows=db.session.query(db.func.count()).select_from(model).scalar()))
+        db.session.flush()
+
+
+def row_count(model):
+    """SQL expression for the model's row count: the stored one, count(*) only when none is stored yet"""
+    stored = db.select(RowCount.rows).where(RowCount.name == model.__tablename__).scalar_subquery()
+    return db.func.coalesce(stored, db.select(db.func.count()).select_from(model).scalar_subquery())
+
+
+def reconcile_row_counts():
+    """Recount every table in COUNTED; returns how many stored counts were wrong"""
+    fixed = 0
+    for model in COUNTED:
+        rows = db.session.query(db.func.count()).select_from(model).scalar()
+        stored = db.session.get(RowCount, model.__tablename__)
+        if stored is None:
+            db.session.add(RowCount(name=model.__tablename__, rows=rows))
+        elif stored.rows != rows:
+            stored.rows = rows
+        else:
+            continue
+        fixed += 1
+    db.session.commit()
+    return fixed
+
+
+@counters_cli.command('reconcile')
+@click.option('--batch-size', default=5000, show_default=True, help="Internships per transaction.")
+def reconcile_command(batch_size):
+    """Rebuild applicant_count, passed_count and score_total from the application table, and the row counts."""
+    fixed = reconcile_counters(batch_size)
+    click.echo(f"Reconciled counters, {fixed} internships were out of date.")
+    fixed = reconcile_row_counts()
+    click.echo(f"Reconciled row counts, {fixed} tables were out of date.")
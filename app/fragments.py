@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import OrderedDict
+
+from markupsafe import Markup
+from werkzeug.utils import import_string
+
+
+class MemoryBackend:
+    """Thread-safe in-process LRU with a TTL, the default fragment store"""
+
+    def __init__(self, max_size=4096, ttl=3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class NullBackend:
+    """Caches nothing, every fragment is rendered on each request"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+BACKENDS = {'memory': MemoryBackend, 'null': NullBackend}
+
+
+class FragmentCache:
+    """Rendered HTML of dashboard cards, keyed by (kind, row id).
+
+    Each entry remembers the version it was rendered for, normally the row's
+    updated_at, or a tuple of every field the card shows when the row has no
+    updated_at of its own. A lookup with any other version is a miss, so another
+    worker's edit is never served stale. Edit and delete routes also
+    invalidate explicitly to free the slot right away.
+
+    FRAGMENT_CACHE_BACKEND is 'memory' (default), 'null', or the import path
+    of a class with get/set/delete/clear taking string keys and values.
+    """
+
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        backend = app.config.setdefault('FRAGMENT_CACHE_BACKEND', 'memory')
+        max_size = app.config.setdefault('FRAGMENT_CACHE_MAX_SIZE', 4096)
+        ttl = app.config.setdefault('FRAGMENT_CACHE_TTL', 3600)
+        cls = BACKENDS.get(backend) or import_string(backend)
+        self.backend = MemoryBackend(max_size, ttl) if cls is MemoryBackend else cls()
+        app.jinja_env.globals['cached_fragment'] = self.render
+
+    @staticmethod
+    def _key(kind, id):
+        return f'{kind}:{id}'
+
+    @classmethod
+    def _version(cls, version):
+        if isinstance(version, (tuple, list)):
+            return '|'.join(map(cls._version, version))
+        return version.isoformat() if hasattr(version, 'isoformat') else str(version)
+
+    def render(self, kind, id, version, macro, *args):
+        """`macro(*args)` rendered once per (kind, id, version), cached HTML afterwards"""
+        key, version = self._key(kind, id), self._version(version)
+        cached = self.backend.get(key)
+        if cached is not None:
+            cached_version, _, html = cached.partition('\n')
+            if cached_version == version:
+                with self._lock:
+                    self.hits += 1
+                return Markup(html)
+
+        html = str(macro(*args))
+        self.backend.set(key, f'{version}\n{html}')
+        with self._lock:
+            self.misses += 1
+        return Markup(html)
+
+    def invalidate(self, kind, ids):
+        for id in ids:
+            self.backend.delete(self._key(kind, id))
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': getattr(self.backend, 'evictions', 0),
+                'size': len(self.backend),
+            }
+
+
+fragments = FragmentCache()
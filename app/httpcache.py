@@ -0,0 +1,138 @@
+import gzip
+import hashlib
+import os
+from datetime import timezone
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+
+from .assets import assets
+
+try:
+    import brotli
+except ImportError:  # optional, responses are gzipped without it
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'application/x-ndjson', 'image/svg+xml',
+}
+
+
+# --------------------------
+# Compression
+# --------------------------
+def _negotiate_encoding():
+    accepted = request.accept_encodings
+    gzip_quality = accepted.quality('gzip')
+    if brotli is not None and accepted.quality('br') and accepted.quality('br') >= gzip_quality:
+        return 'br'
+    return 'gzip' if gzip_quality else None
+
+
+def _compress(response):
+    config = current_app.config
+    if (not config['COMPRESS_ENABLED'] or response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers or response.mimetype not in config['COMPRESS_MIMETYPES']):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _negotiate_encoding()
+    if encoding is None or (response.content_length or 0) < config['COMPRESS_MIN_SIZE']:
+        return response
+
+    data = response.get_data()
+    if encoding == 'br':
+        data = brotli.compress(data, quality=config['COMPRESS_BROTLI_QUALITY'])
+    else:
+        data = gzip.compress(data, compresslevel=config['COMPRESS_LEVEL'], mtime=0)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    # The bytes differ per encoding, so a strong validator no longer holds
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+# --------------------------
+# Conditional GET
+# --------------------------
+def _template_version(app):
+    """Digest of every template, so a deploy that changes markup also changes the ETags"""
+    digest = hashlib.sha1()
+    folder = os.path.join(app.root_path, app.template_folder)
+    for directory, _, files in sorted(os.walk(folder)):
+        for name in sorted(files):
+            with open(os.path.join(directory, name), 'rb') as f:
+                digest.update(name.encode() + b'\0' + f.read())
+    return digest.hexdigest()[:12]
+
+
+def _etag(parts):
+    key = repr((current_app.config['ETAG_SALT'], assets.version(), session.get('user_id'), session.get('role'),
+                request.full_path, parts))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _is_fresh(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    return (last_modified is not None and request.if_modified_since is not None
+            and last_modified <= request.if_modified_since)
+
+
+def conditional(version, shows_flashes=True):
+    """Answer 304 Not Modified before the view runs when the client's copy is current.
+
+    `version(**view_args)` returns (parts, last_modified) describing everything
+    the page shows, read with one cheap aggregate query, or None when the page
+    must not be cached (not signed in, wrong role). The ETag hashes those parts
+    with the user, the URL, the templates and the asset bundles. Pages carrying
+    flashed messages are never validated, they only render once; pass
+    shows_flashes=False for responses that never display them (JSON).
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapped(*args, **kwargs):
+            if (not current_app.config['CONDITIONAL_GET'] or request.method not in ('GET', 'HEAD')
+                    or shows_flashes and session.get('_flashes')):
+                return f(*args, **kwargs)
+            current = version(**kwargs)
+            if current is None:
+                return f(*args, **kwargs)
+
+            parts, last_modified = current
+            etag = _etag(parts)
+            if last_modified is not None:
+                # Stored as naive UTC, HTTP dates have whole seconds
+                last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+            if _is_fresh(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Revalidate on every visit, and only in the user's own browser cache
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+            return response
+        return wrapped
+    return decorator
+
+
+def init_http_cache(app):
+    """Gzip (or brotli, when installed) responses and set up conditional GETs"""
+    app.config.setdefault('COMPRESS_ENABLED', True)
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+    app.config.setdefault('COMPRESS_MIMETYPES', COMPRESSIBLE_MIMETYPES)
+    app.config.setdefault('CONDITIONAL_GET', True)
+    if app.config.get('ETAG_SALT') is None:
+        app.config['ETAG_SALT'] = _template_version(app)
+    app.after_request(_compress)
@@ -0,0 +1,196 @@
+import logging
+import threading
+import time
+
+from flask import current_app, g, has_app_context, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+
+from .models import db
+from .querycount import query_count
+from .fragments import fragments
+from .quizbank import quiz_banks
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labels, key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _format_labels(self.labels, key, [('le', bound)])
+                    lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, [("le", "+Inf")])} {count}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {total}')
+                lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {count}')
+        return lines
+
+
+class Metrics:
+    """Per-app metric registry, stored in app.extensions['metrics']"""
+
+    def __init__(self):
+        self.requests = Counter('http_requests_total', 'Requests by endpoint and status.', ('endpoint', 'method', 'status'))
+        self.latency = Histogram('http_request_duration_seconds', 'Request latency by endpoint.', ('endpoint', 'method'))
+        self.queries = Histogram('db_queries_per_request', 'SQL statements issued per request.', ('endpoint',),
+                                 QUERY_COUNT_BUCKETS)
+        self.query_time = Histogram('db_query_time_per_request_seconds', 'Time spent in SQL per request.', ('endpoint',))
+        self.slow_queries = Counter('db_slow_queries_total', 'SQL statements slower than SLOW_QUERY_MS.', ('endpoint',))
+        self.render_time = Histogram('template_render_duration_seconds', 'Jinja render time by template.', ('template',))
+
+    def collectors(self):
+        return [self.requests, self.latency, self.queries, self.query_time, self.slow_queries, self.render_time]
+
+
+def _endpoint():
+    return (request.endpoint or 'unknown') if has_request_context() else 'none'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own execution context, which is discarded with it
+    # even when the statement raises and after_cursor_execute never runs
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_query_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    if has_request_context():
+        g.query_time = g.get('query_time', 0.0) + elapsed
+    if not has_app_context():
+        return
+    if elapsed * 1000 >= current_app.config['SLOW_QUERY_MS']:
+        current_app.extensions['metrics'].slow_queries.inc(endpoint=_endpoint())
+        logger.warning("Slow query (%.1f ms) in %s: %s", elapsed * 1000, _endpoint(), ' '.join(statement.split())[:500])
+
+
+def _before_render(sender, template, context, **extra):
+    g.setdefault('render_start', []).append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    starts = g.get('render_start')
+    if starts:
+        sender.extensions['metrics'].render_time.observe(time.perf_counter() - starts.pop(), template=template.name)
+
+
+def _start_request():
+    g.request_start = time.perf_counter()
+
+
+def _finish_request(response):
+    start = g.pop('request_start', None)
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    endpoint = _endpoint()
+    metrics = current_app.extensions['metrics']
+    metrics.requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    metrics.latency.observe(elapsed, endpoint=endpoint, method=request.method)
+    metrics.queries.observe(query_count(), endpoint=endpoint)
+    metrics.query_time.observe(g.get('query_time', 0.0), endpoint=endpoint)
+    if elapsed * 1000 >= current_app.config['SLOW_REQUEST_MS']:
+        logger.warning("Slow request (%.1f ms, %d queries): %s %s",
+                       elapsed * 1000, query_count(), request.method, request.full_path)
+    return response
+
+
+def init_instrumentation(app):
+    """Install request, SQL and template timing when METRICS_ENABLED is set"""
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    app.extensions['metrics'] = Metrics()
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def render_metrics():
+    """All metrics in Prometheus text exposition format"""
+    stats = quiz_banks.stats()
+    lines = [
+        '# TYPE quiz_bank_cache_hits_total counter',
+        f"quiz_bank_cache_hits_total {stats['hits']}",
+        '# TYPE quiz_bank_cache_misses_total counter',
+        f"quiz_bank_cache_misses_total {stats['misses']}",
+        '# TYPE quiz_bank_cache_evictions_total counter',
+        f"quiz_bank_cache_evictions_total {stats['evictions']}",
+        '# TYPE quiz_bank_cache_entries gauge',
+        f"quiz_bank_cache_entries {stats['size']}",
+    ]
+    stats = fragments.stats()
+    lines += [
+        '# TYPE fragment_cache_hits_total counter',
+        f"fragment_cache_hits_total {stats['hits']}",
+        '# TYPE fragment_cache_misses_total counter',
+        f"fragment_cache_misses_total {stats['misses']}",
+        '# TYPE fragment_cache_evictions_total counter',
+        f"fragment_cache_evictions_total {stats['evictions']}",
+        '# TYPE fragment_cache_entries gauge',
+        f"fragment_cache_entries {stats['size']}",
+    ]
+    metrics = current_app.extensions.get('metrics')
+    if metrics is not None:
+        for collector in metrics.collectors():
+            lines.extend(collector.render())
+    return '\n'.join(lines) + '\n'
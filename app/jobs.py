@@ -0,0 +1,191 @@
+import json
+import logging
+import random
+import time
+import traceback
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .models import db, Job
+
+logger = logging.getLogger(__name__)
+
+jobs_cli = AppGroup('jobs', help="Run and inspect background jobs.")
+
+TASKS = {}
+
+
+def task(name, max_attempts=5):
+    """Register a function as a job handler; it receives the payload as keyword arguments.
+
+    Handlers may run more than once (a retry after a crash, or a worker
+    dying between the work and marking the job done), so they must be safe
+    to repeat.
+    """
+    def decorator(f):
+        TASKS[name] = (f, max_attempts)
+        return f
+    return decorator
+
+
+# --------------------------
+# Producing jobs
+# --------------------------
+def _insert_ignoring_duplicates(values):
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = (sqlite.insert if dialect == 'sqlite' else postgresql.insert)(Job)
+        db.session.execute(insert.values(**values).on_conflict_do_nothing(index_elements=['idempotency_key']))
+    elif not Job.query.filter_by(idempotency_key=values['idempotency_key']).first():
+        db.session.execute(db.insert(Job).values(**values))
+
+
+def enqueue(name, payload=None, key=None, delay=0):
+    """Queue a job inside the caller's transaction.
+
+    The job only becomes visible if the caller commits, so a rolled back
+    request never leaves work behind. With `key`, a job that was already
+    queued under the same key (in any state) makes this a no-op.
+    """
+    if name not in TASKS:
+        raise KeyError(f"Unknown job {name!r}")
+    values = {
+        'name': name,
+        'payload': json.dumps(payload or {}, separators=(',', ':')),
+        'idempotency_key': key,
+        'status': 'queued',
+        'attempts': 0,
+        'max_attempts': TASKS[name][1],
+        'run_at': datetime.utcnow() + timedelta(seconds=delay),
+        'created_at': datetime.utcnow(),
+    }
+    if key is None:
+        db.session.execute(db.insert(Job).values(**values))
+    else:
+        _insert_ignoring_duplicates(values)
+
+
+# --------------------------
+# Running jobs
+# --------------------------
+def backoff(attempts):
+    """Seconds before retry number `attempts`: exponential with full jitter, capped"""
+    base = current_app.config.get('JOBS_BACKOFF_SECONDS', 30)
+    cap = current_app.config.get('JOBS_BACKOFF_MAX', 3600)
+    return random.uniform(0, min(cap, base * 2 ** (attempts - 1)))
+
+
+def requeue_stale():
+    """Put back jobs whose worker died mid-run, once JOBS_LOCK_TIMEOUT has passed"""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config.get('JOBS_LOCK_TIMEOUT', 600))
+    result = db.session.execute(
+        db.update(Job).where(Job.status == 'running', Job.locked_at < cutoff).values(status='queued', locked_at=None)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def claim_next():
+    """Atomically take the next due job, or None when the queue is empty.
+
+    The conditional UPDATE only succeeds for one worker, so several
+    workers can poll the same table without locking it.
+    """
+    while True:
+        job = (Job.query.filter(Job.status == 'queued', Job.run_at <= datetime.utcnow())
+               .order_by(Job.run_at, Job.id).first())
+        if job is None:
+            db.session.rollback()
+            return None
+        claimed = db.session.execute(
+            db.update(Job).where(Job.id == job.id, Job.status == 'queued')
+            .values(status='running', locked_at=datetime.utcnow(), attempts=Job.attempts + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            db.session.refresh(job)
+            return job
+
+
+def run_job(job):
+    """Run one claimed job and record the outcome; returns True on success"""
+    handler = TASKS.get(job.name)
+    try:
+        if handler is None:
+            raise KeyError(f"No handler registered for {job.name!r}")
+        handler[0](**json.loads(job.payload))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc(limit=5)
+        if job.attempts < job.max_attempts:
+            delay = backoff(job.attempts)
+            job.status, job.run_at = 'queued', datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning("Job %s (%s) failed, attempt %d/%d, retrying in %.0fs",
+                           job.id, job.name, job.attempts, job.max_attempts, delay)
+        else:
+            job.status, job.finished_at = 'failed', datetime.utcnow()
+            logger.error("Job %s (%s) failed permanently after %d attempts", job.id, job.name, job.attempts)
+        job.last_error, job.locked_at = error, None
+        db.session.commit()
+        return False
+
+    job.status, job.finished_at, job.locked_at, job.last_error = 'done', datetime.utcnow(), None, None
+    db.session.commit()
+    return True
+
+
+def work(once=False, poll_interval=1.0, max_jobs=None):
+    """Process jobs until the queue is empty (once) or forever; returns the number run"""
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        if processed % 100 == 0:
+            requeue_stale()
+        job = claim_next()
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+        processed += 1
+    return processed
+
+
+# --------------------------
+# Commands
+# --------------------------
+@jobs_cli.command('work')
+@click.option('--once', is_flag=True, help="Exit when no job is due instead of polling.")
+@click.option('--poll-interval', default=1.0, show_default=True, help="Seconds to sleep when the queue is empty.")
+@click.option('--max-jobs', type=int, help="Exit after this many jobs.")
+def work_command(once, poll_interval, max_jobs):
+    """Run queued jobs."""
+    processed = work(once=once, poll_interval=poll_interval, max_jobs=max_jobs)
+    click.echo(f"Processed {processed} jobs.")
+
+
+@jobs_cli.command('status')
+def status_command():
+    """Count jobs by state."""
+    for status, count in db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).order_by(Job.status):
+        click.echo(f"{status:8} {count}")
+
+
+@jobs_cli.command('retry')
+@click.argument('job_ids', nargs=-1, type=int)
+def retry_command(job_ids):
+    """Queue failed jobs again (all of them without JOB_IDS)."""
+    query = db.update(Job).where(Job.status == 'failed')
+    if job_ids:
+        query = query.where(Job.id.in_(job_ids))
+    count = db.session.execute(
+        query.values(status='queued', attempts=0, run_at=datetime.utcnow(), finished_at=None)
+    ).rowcount
+    db.session.commit()
+    click.echo(f"Requeued {count} jobs.")
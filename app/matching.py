@@ -0,0 +1,56 @@
+from .models import db, Internship, Skill, internship_skill, profile_skill
+from .pagination import DEFAULT_PER_PAGE, paginate
+
+
+def normalize_skill(name):
+    """Canonical lookup key for a skill name ("  Machine  Learning" -> "machine learning")"""
+    return ' '.join((name or '').split()).lower()
+
+
+def get_or_create_skills(names):
+    """Resolve skill names to Skill rows, creating the missing ones in one batch"""
+    wanted = {}
+    for name in names or []:
+        key = normalize_skill(name)
+        if key and key not in wanted:
+            wanted[key] = ' '.join(name.split())
+    if not wanted:
+        return []
+
+    existing = {skill.key: skill for skill in Skill.query.filter(Skill.key.in_(list(wanted))).all()}
+    for key, name in wanted.items():
+        if key not in existing:
+            existing[key] = Skill(key=key, name=name)
+            db.session.add(existing[key])
+    return [existing[key] for key in wanted]
+
+
+def skills_from_form(value):
+    """Skill rows for a comma separated form field"""
+    return get_or_create_skills(value.split(',') if value else [])
+
+
+def match_internships(student, per_page=DEFAULT_PER_PAGE, after=None, before=None):
+    """Rank internships by the number of skills they share with `student`.
+
+    The student's skills are joined in SQL through profile_skill, and only
+    internships reachable through the internship_skill index are read, so the
+    cost follows the number of matches instead of the number of postings.
+    Returns a Page of (internship, score) pairs, keyset-paginated on
+    (score, created_at, id).
+    """
+    student_skills = db.select(profile_skill.c.skill_id).where(profile_skill.c.profile_id == student.id)
+    score = db.func.count(internship_skill.c.skill_id)
+    query = (
+        db.session.query(Internship, score.label('score'))
+        .join(internship_skill, internship_skill.c.internship_id == Internship.id)
+        .filter(internship_skill.c.skill_id.in_(student_skills))
+        .group_by(Internship.id)
+    )
+    page = paginate(
+        query,
+        order_by=[score, Internship.created_at, Internship.id],
+        key=lambda row: (row.score, row[0].created_at, row[0].id),
+        per_page=per_page, after=after, before=before, having=True,
+    )
+    return page._replace(items=[tuple(row) for row in page.items])
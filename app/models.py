@@ -7,45 +7,180 @@ db = SQLAlchemy()
 class Profile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     role = db.Column(db.String(20), nullable=False)
-    full_name = db.Column(db.String(100), nullable=False)
+    full_name = db.Column(db.String(100), nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False)  # Added email field
+    password_hash = db.Column(db.String(255))  # werkzeug format, NULL until set via a reset link
     department = db.Column(db.String(100))
-    skills = db.Column(db.PickleType)
     company_name = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # fragment cache version
+
+    skills = db.relationship('Skill', secondary='profile_skill', lazy='selectin', order_by='Skill.name',
+                             passive_deletes=True)
 
 class Internship(db.Model):
+    __table_args__ = (
+        # Employer dashboard: filter by employer, keyset on (created_at, id)
+        db.Index('ix_internship_employer_id_created_at', 'employer_id', 'created_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    employer_id = db.Column(db.Integer, db.ForeignKey('profile.id'), nullable=False)
+    employer_id = db.Column(db.Integer, db.ForeignKey('profile.id', ondelete='CASCADE'), nullable=False)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     department = db.Column(db.String(100))
-    required_skills = db.Column(db.PickleType)
     location = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Fragment cache and conditional GET version, indexed so max(updated_at) is a single index probe
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    # Denormalized from Application, kept in step by counters.record_application()
+    applicant_count = db.Column(db.Integer, nullable=False, default=0)
+    passed_count = db.Column(db.Integer, nullable=False, default=0)
+    score_total = db.Column(db.Integer, nullable=False, default=0)
     
-    # Relationships
-    employer = db.relationship('Profile', backref='posted_internships', foreign_keys=[employer_id])
-    technical_questions = db.relationship('TechnicalQuestion', backref='internship', lazy=True, cascade='all, delete-orphan')
+    # Relationships. Dependent rows go with ON DELETE CASCADE, passive_deletes keeps
+    # the ORM from loading them just to delete them one by one.
+    employer = db.relationship('Profile', foreign_keys=[employer_id], backref=db.backref(
+        'posted_internships', cascade='save-update, merge, delete', passive_deletes=True))
+    technical_questions = db.relationship('TechnicalQuestion', backref='internship', lazy=True,
+                                          cascade='all, delete-orphan', passive_deletes=True)
+    required_skills = db.relationship('Skill', secondary='internship_skill', lazy='selectin', order_by='Skill.name',
+                                      passive_deletes=True)
+
+    @property
+    def failed_count(self):
+        return self.applicant_count - self.passed_count
+
+    @property
+    def average_score(self):
+        return round(self.score_total / self.applicant_count) if self.applicant_count else 0
+
+class Skill(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), unique=True, nullable=False)  # normalized lookup key
+    name = db.Column(db.String(100), nullable=False)
+
+# Inverted skill -> internship index, primary key is skill first so lookups by skill are index scans
+internship_skill = db.Table(
+    'internship_skill',
+    db.Column('skill_id', db.Integer, db.ForeignKey('skill.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('internship_id', db.Integer, db.ForeignKey('internship.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_internship_skill_internship_id', 'internship_id'),
+)
+
+profile_skill = db.Table(
+    'profile_skill',
+    db.Column('profile_id', db.Integer, db.ForeignKey('profile.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('skill_id', db.Integer, db.ForeignKey('skill.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_profile_skill_skill_id', 'skill_id'),
+)
 
 class TechnicalQuestion(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    internship_id = db.Column(db.Integer, db.ForeignKey('internship.id'), nullable=False)
+    internship_id = db.Column(db.Integer, db.ForeignKey('internship.id', ondelete='CASCADE'), nullable=False, index=True)
+    question = db.Column(db.Text, nullable=False)
+    correct_answer = db.Column(db.Boolean, nullable=False)
+    notes = db.Column(db.Text)
+
+class QuestionBank(db.Model):
+    """Named set of technical questions an employer can apply to any of their internships"""
+    __table_args__ = (
+        db.Index('uq_question_bank_employer_id_name', 'employer_id', 'name', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    employer_id = db.Column(db.Integer, db.ForeignKey('profile.id', ondelete='CASCADE'), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    questions = db.relationship('BankQuestion', backref='bank', lazy=True, order_by='BankQuestion.position',
+                                cascade='all, delete-orphan', passive_deletes=True)
+
+class BankQuestion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    bank_id = db.Column(db.Integer, db.ForeignKey('question_bank.id', ondelete='CASCADE'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)  # questions are applied in this order
     question = db.Column(db.Text, nullable=False)
     correct_answer = db.Column(db.Boolean, nullable=False)
     notes = db.Column(db.Text)
 
 class Application(db.Model):
+    __table_args__ = (
+        # One application per student and internship, also serves lookups by student
+        db.Index('uq_application_student_id_internship_id', 'student_id', 'internship_id', unique=True),
+        # Applicant lists: filter by internship, keyset on (applied_at, id)
+        db.Index('ix_application_internship_id_applied_at', 'internship_id', 'applied_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    student_id = db.Column(db.Integer, db.ForeignKey('profile.id'), nullable=False)
-    internship_id = db.Column(db.Integer, db.ForeignKey('internship.id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('profile.id', ondelete='CASCADE'), nullable=False)
+    internship_id = db.Column(db.Integer, db.ForeignKey('internship.id', ondelete='CASCADE'), nullable=False)
     applied_at = db.Column(db.DateTime, default=datetime.utcnow)
     quiz_passed = db.Column(db.Boolean, default=False)
     quiz_score = db.Column(db.Integer, default=0)
     
     # Relationships
-    student = db.relationship('Profile', foreign_keys=[student_id], backref='applications')
-    internship = db.relationship('Internship', backref='applications')
+    student = db.relationship('Profile', foreign_keys=[student_id], backref=db.backref(
+        'applications', cascade='save-update, merge, delete', passive_deletes=True))
+    internship = db.relationship('Internship', backref=db.backref(
+        'applications', cascade='save-update, merge, delete', passive_deletes=True))
+
+class Recommendation(db.Model):
+    """Precomputed top internships per student, rebuilt by recommend.refresh_recommendations()"""
+    __table_args__ = (
+        db.Index('ix_recommendation_student_id_score', 'student_id', 'score'),
+        db.Index('ix_recommendation_internship_id', 'internship_id'),
+    )
+
+    student_id = db.Column(db.Integer, db.ForeignKey('profile.id', ondelete='CASCADE'), primary_key=True)
+    internship_id = db.Column(db.Integer, db.ForeignKey('internship.id', ondelete='CASCADE'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Job(db.Model):
+    """Background work queued by requests and run by `flask jobs work`"""
+    __table_args__ = (
+        # Workers poll for the next due job in a given state
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    idempotency_key = db.Column(db.String(200), unique=True)  # a second enqueue with the same key is dropped
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+class ApplicationDaily(db.Model):
+    """Applications per internship, day, student department and score decile, kept by analytics.refresh_rollups()"""
+    __tablename__ = 'application_daily'
+
+    internship_id = db.Column(db.Integer, db.ForeignKey('internship.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    department = db.Column(db.String(100), primary_key=True)  # '' when the student gave none
+    score_bucket = db.Column(db.Integer, primary_key=True)  # 0 for 0-9% ... 9 for 90-100%
+    applicants = db.Column(db.Integer, nullable=False, default=0)
+    passed = db.Column(db.Integer, nullable=False, default=0)
+    score_total = db.Column(db.Integer, nullable=False, default=0)
+
+class RollupWatermark(db.Model):
+    """Highest source row id already folded into a rollup"""
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime)
+
+class RowCount(db.Model):
+    """Row count of a table, kept by counters.adjust_row_count() so version checks never count(*) it"""
+    name = db.Column(db.String(50), primary_key=True)  # table name
+    rows = db.Column(db.Integer, nullable=False, default=0)
 
 # General questions pool
 GENERAL_QUESTIONS = [
@@ -0,0 +1,85 @@
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from .models import db
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+Page = namedtuple('Page', 'items next_cursor prev_cursor')
+
+
+def page_size(value):
+    """Clamp a requested page size to 1..MAX_PER_PAGE"""
+    if not value:
+        return DEFAULT_PER_PAGE
+    return max(1, min(value, MAX_PER_PAGE))
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def _decode_value(obj):
+    if 'dt' in obj:
+        return datetime.fromisoformat(obj['dt'])
+    return obj
+
+
+def encode_cursor(values):
+    """Opaque, URL safe token for a row's sort key"""
+    raw = json.dumps(list(values), default=_encode_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Sort key from encode_cursor(), or None if the token is missing or malformed"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw, object_hook=_decode_value)
+    except (ValueError, binascii.Error):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def paginate(query, order_by, key, per_page=DEFAULT_PER_PAGE, after=None, before=None, having=False):
+    """Keyset pagination, newest first, over the columns in `order_by`.
+
+    `key(row)` returns a row's values for `order_by`; the last column must be
+    unique (normally the primary key). Pages seek with a row-value comparison
+    against the cursor instead of OFFSET, so every page costs the same no
+    matter how deep it is. Pass having=True when `order_by` includes an
+    aggregate.
+    """
+    cursor = decode_cursor(before) or decode_cursor(after)
+    backwards = cursor is not None and decode_cursor(before) is not None
+    if cursor is not None and len(cursor) == len(order_by):
+        sort_key = db.tuple_(*order_by)
+        condition = sort_key > db.tuple_(*cursor) if backwards else sort_key < db.tuple_(*cursor)
+        query = query.having(condition) if having else query.filter(condition)
+    else:
+        cursor, backwards = None, False
+
+    ordering = [column.asc() if backwards else column.desc() for column in order_by]
+    rows = query.order_by(*ordering).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    if not rows:
+        return Page(rows, None, None)
+    has_next = cursor is not None if backwards else has_more
+    has_prev = has_more if backwards else cursor is not None
+    return Page(
+        rows,
+        encode_cursor(key(rows[-1])) if has_next else None,
+        encode_cursor(key(rows[0])) if has_prev else None,
+    )
@@ -0,0 +1,45 @@
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+
+from .models import db
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view issued more SQL statements than its declared budget"""
+
+
+def query_budget(limit):
+    """Declare how many SQL statements a view may issue per request"""
+    def decorator(f):
+        f.query_budget = limit
+        return f
+    return decorator
+
+
+def query_count():
+    """Number of SQL statements issued so far in the current request"""
+    return g.get('query_count', 0)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context():
+        g.query_count = g.get('query_count', 0) + 1
+
+
+def _check_budget(response):
+    if not current_app.config.get('QUERY_BUDGET_ENFORCED', current_app.testing):
+        return response
+    view = current_app.view_functions.get(request.endpoint)
+    limit = getattr(view, 'query_budget', None)
+    if limit is not None and query_count() > limit:
+        raise QueryBudgetExceeded(
+            f"{request.endpoint} issued {query_count()} queries, budget is {limit}"
+        )
+    return response
+
+
+def init_query_budget(app):
+    """Count statements per request and, in testing mode, fail requests over budget"""
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _count_query)
+    app.after_request(_check_budget)
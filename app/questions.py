@@ -0,0 +1,115 @@
+import re
+from datetime import datetime
+
+from .models import db, BankQuestion, QuestionBank, TechnicalQuestion
+
+FIELDS = ('question', 'correct_answer', 'notes')
+_QUESTION_FIELD = re.compile(r'question_(\d+)$')
+
+
+# --------------------------
+# The manage_questions form
+# --------------------------
+def questions_from_form(form):
+    """[{'id', 'question', 'correct_answer', 'notes'}] from the question_N, answer_N, notes_N and id_N fields.
+
+    Any number of slots, in N order. A slot left without text or answer is
+    dropped, which deletes the question it held.
+    """
+    slots = sorted(int(match.group(1)) for match in map(_QUESTION_FIELD.match, form) if match)
+    rows = []
+    for n in slots:
+        text = (form.get(f'question_{n}') or '').strip()
+        answer = form.get(f'answer_{n}')
+        if not text or answer not in ('yes', 'no'):
+            continue
+        rows.append({
+            'id': form.get(f'id_{n}', type=int),
+            'question': text,
+            'correct_answer': answer == 'yes',
+            'notes': (form.get(f'notes_{n}') or '').strip(),
+        })
+    return rows
+
+
+def sync_questions(internship_id, rows):
+    """Make the internship's questions match `rows`, writing only what changed; returns (added, changed, removed).
+
+    A row carrying the id of one of the internship's questions updates it in
+    place, and only when a field differs, so quizzes already served keep
+    their question keys. Other rows are inserted and questions missing from
+    `rows` deleted: at most one statement each for deletes, updates and inserts.
+    """
+    current = {
+        row.id: {'question': row.question, 'correct_answer': row.correct_answer, 'notes': row.notes or ''}
+        for row in db.session.query(TechnicalQuestion.id, *(getattr(TechnicalQuestion, name) for name in FIELDS))
+        .filter_by(internship_id=internship_id)
+    }
+    inserts, updates, kept = [], [], set()
+    for row in rows:
+        values = {name: row[name] for name in FIELDS}
+        id = row.get('id')
+        if id not in current or id in kept:
+            inserts.append(dict(values, internship_id=internship_id))
+            continue
+        kept.add(id)
+        if values != current[id]:
+            updates.append(dict(values, id=id))
+    removed = [id for id in current if id not in kept]
+
+    if removed:
+        db.session.execute(db.delete(TechnicalQuestion).where(TechnicalQuestion.id.in_(removed)))
+    if updates:
+        db.session.execute(db.update(TechnicalQuestion), updates)  # executemany by primary key
+    if inserts:
+        db.session.execute(db.insert(TechnicalQuestion), inserts)
+    return len(inserts), len(updates), len(removed)
+
+
+# --------------------------
+# Question banks (templates)
+# --------------------------
+def question_banks(employer_id):
+    """[(id, name, question count)] of the employer's banks, by name"""
+    return (db.session.query(QuestionBank.id, QuestionBank.name, db.func.count(BankQuestion.id))
+            .outerjoin(BankQuestion, BankQuestion.bank_id == QuestionBank.id)
+            .filter(QuestionBank.employer_id == employer_id)
+            .group_by(QuestionBank.id, QuestionBank.name)
+            .order_by(QuestionBank.name)
+            .all())
+
+
+def save_bank(employer_id, name, internship_id):
+    """Store the internship's questions as the employer's bank `name`, replacing the contents of one so named.
+
+    The questions are copied with a single INSERT ... SELECT. Returns the bank.
+    """
+    bank = QuestionBank.query.filter_by(employer_id=employer_id, name=name).first()
+    if bank is None:
+        bank = QuestionBank(employer_id=employer_id, name=name)
+        db.session.add(bank)
+        db.session.flush()
+    else:
+        db.session.execute(db.delete(BankQuestion).where(BankQuestion.bank_id == bank.id))
+        bank.updated_at = datetime.utcnow()
+    db.session.execute(db.insert(BankQuestion).from_select(
+        ['bank_id', 'position', 'question', 'correct_answer', 'notes'],
+        db.select(db.literal(bank.id, db.Integer), TechnicalQuestion.id, TechnicalQuestion.question,
+                  TechnicalQuestion.correct_answer, TechnicalQuestion.notes)
+        .where(TechnicalQuestion.internship_id == internship_id),
+    ))
+    return bank
+
+
+def apply_bank(bank_id, internship_id):
+    """Add the bank's questions the internship does not have yet, with a single INSERT ... SELECT; returns how many"""
+    present = db.select(TechnicalQuestion.id).where(TechnicalQuestion.internship_id == internship_id,
+                                                    TechnicalQuestion.question == BankQuestion.question)
+    result = db.session.execute(db.insert(TechnicalQuestion).from_select(
+        ['internship_id', 'question', 'correct_answer', 'notes'],
+        db.select(db.literal(internship_id, db.Integer), BankQuestion.question, BankQuestion.correct_answer,
+                  BankQuestion.notes)
+        .where(BankQuestion.bank_id == bank_id, ~present.exists())
+        .order_by(BankQuestion.position),
+    ))
+    return result.rowcount
@@ -0,0 +1,156 @@
+import math
+import random
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from .models import db, Internship, TechnicalQuestion, GENERAL_QUESTIONS
+
+PASS_MARK = 75  # percent
+
+# `answers` maps every question key a quiz for this internship can contain,
+# general and technical, to its correct 'yes'/'no'
+QuizBank = namedtuple('QuizBank', 'id title technical answers')
+
+
+def _quiz_item(key, question, answer, notes):
+    return {'id': key, 'question': question, 'answer': 'yes' if answer else 'no', 'notes': notes}
+
+
+# Compiled once at import, GENERAL_QUESTIONS never changes at runtime
+GENERAL_QUIZ_ITEMS = tuple(
+    _quiz_item(f'g{i}', q['question'], q['answer'], q['notes']) for i, q in enumerate(GENERAL_QUESTIONS)
+)
+GENERAL_ANSWERS = {item['id']: item['answer'] for item in GENERAL_QUIZ_ITEMS}
+
+
+class QuizBankCache:
+    """Per-process LRU cache of compiled quiz banks, keyed by internship id.
+
+    Entries hold plain tuples and dicts, never ORM objects, so they are safe to
+    share between requests and threads. manage_questions and the internship
+    edit/delete routes invalidate explicitly; the TTL bounds how stale another
+    worker process can be.
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_size = app.config.setdefault('QUIZ_BANK_MAX_SIZE', self.max_size)
+        self.ttl = app.config.setdefault('QUIZ_BANK_TTL', self.ttl)
+
+    def get(self, internship_id):
+        """The QuizBank for an internship, or None if the internship does not exist"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(internship_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(internship_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        bank = self._load(internship_id)
+        if bank is not None:
+            with self._lock:
+                self._entries[internship_id] = (now + self.ttl, bank)
+                self._entries.move_to_end(internship_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return bank
+
+    def invalidate(self, internship_id):
+        with self._lock:
+            self._entries.pop(internship_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+            }
+
+    def _load(self, internship_id):
+        row = db.session.query(Internship.id, Internship.title).filter_by(id=internship_id).first()
+        if row is None:
+            return None
+        questions = (db.session.query(TechnicalQuestion.id, TechnicalQuestion.question,
+                                      TechnicalQuestion.correct_answer, TechnicalQuestion.notes)
+                     .filter_by(internship_id=internship_id)
+                     .order_by(TechnicalQuestion.id)
+                     .all())
+        technical = tuple(_quiz_item(f't{q.id}', q.question, q.correct_answer, q.notes) for q in questions)
+        answers = dict(GENERAL_ANSWERS)
+        answers.update((item['id'], item['answer']) for item in technical)
+        return QuizBank(row.id, row.title, technical, answers)
+
+
+quiz_banks = QuizBankCache()
+
+
+def build_quiz(bank, general_count=4, technical_count=4):
+    """Random quiz drawn from the precompiled general pool and an internship's bank"""
+    questions = random.sample(GENERAL_QUIZ_ITEMS, min(general_count, len(GENERAL_QUIZ_ITEMS)))
+    questions += random.sample(bank.technical, min(technical_count, len(bank.technical)))
+    random.shuffle(questions)
+    return questions
+
+
+def passing_answers(total):
+    """Correct answers needed to reach PASS_MARK on a quiz of `total` questions"""
+    return math.ceil(total * PASS_MARK / 100)
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.secret_key, salt='quiz')
+
+
+def sign_quiz(student_id, internship_id, questions):
+    """Signed token recording which questions were served to which student.
+
+    The answers never leave the server, the token only carries question keys,
+    so a quiz costs no database write when it is served.
+    """
+    return _serializer().dumps([student_id, internship_id, [q['id'] for q in questions]])
+
+
+def load_quiz(token, student_id, internship_id):
+    """Question keys from sign_quiz(), or None if the token is invalid, expired or not for this quiz"""
+    try:
+        signed_student, signed_internship, keys = _serializer().loads(
+            token or '', max_age=current_app.config.get('QUIZ_TOKEN_MAX_AGE', 3600)
+        )
+    except (BadSignature, ValueError, TypeError):
+        return None
+    if signed_student != student_id or signed_internship != internship_id or not keys:
+        return None
+    return keys
+
+
+def grade_quiz(bank, keys, responses):
+    """Number of correct responses, or None if a served question no longer exists.
+
+    `responses` is aligned with `keys`; each one is checked with a single
+    lookup in the bank's answer vector.
+    """
+    answers = bank.answers
+    if any(key not in answers for key in keys):
+        return None
+    return sum(1 for key, response in zip(keys, responses) if answers[key] == response)
@@ -0,0 +1,219 @@
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+import click
+import numpy as np
+from flask.cli import AppGroup
+
+from .counters import row_count
+from .jobs import task
+from .models import db, Application, Internship, Profile, Recommendation, internship_skill, profile_skill
+
+recommend_cli = AppGroup('recommend', help="Precompute internship recommendations per student.")
+
+TOP_K = 20
+SKILL_WEIGHT = 0.7       # IDF-weighted Jaccard similarity of skill sets
+DEPARTMENT_WEIGHT = 0.2  # internship department equals the student's
+LOCATION_WEIGHT = 0.1    # share of the student's past applications at the internship's location
+
+
+def _normalize(value):
+    return ' '.join((value or '').split()).lower()
+
+
+class RecommendationModel:
+    """The internship x skill bit matrix, stored column-wise as posting lists.
+
+    Scoring a student adds one IDF weight per skill into the internships on
+    that skill's posting list, then combines whole arrays for the Jaccard
+    ratio, department and location, so there is no Python loop over
+    internships.
+    """
+
+    def __init__(self, internship_ids, links, departments, locations):
+        self.ids = np.asarray(internship_ids, dtype=np.int64)
+        count = len(self.ids)
+
+        # Compact skill index and per-skill posting lists (CSC layout of the internship x skill matrix)
+        internship_pos = np.searchsorted(self.ids, np.asarray([i for i, _ in links], dtype=np.int64))
+        skill_ids, skill_pos = np.unique(np.asarray([s for _, s in links], dtype=np.int64), return_inverse=True)
+        self.skill_index = {int(skill_id): i for i, skill_id in enumerate(skill_ids)}
+        order = np.argsort(skill_pos, kind='stable')
+        self.postings = internship_pos[order]
+        frequency = np.bincount(skill_pos, minlength=len(skill_ids))
+        self.indptr = np.concatenate(([0], np.cumsum(frequency)))
+
+        # Rare skills say more about a posting than ubiquitous ones
+        self.idf = (np.log((1 + count) / (1 + frequency)) + 1).astype(np.float32)
+        self.unseen_idf = np.float32(np.log(1 + count) + 1)
+        self.weight = np.bincount(internship_pos, weights=self.idf[skill_pos], minlength=count).astype(np.float32)
+
+        self.department_codes, self.departments = self._encode(departments)
+        self.location_codes, self.locations = self._encode(locations)
+
+    @staticmethod
+    def _encode(values):
+        codes, vocabulary = [], {}
+        for value in values:
+            value = _normalize(value)
+            codes.append(vocabulary.setdefault(value, len(vocabulary)) if value else -1)
+        return np.asarray(codes, dtype=np.int32), vocabulary
+
+    @classmethod
+    def load(cls):
+        rows = db.session.query(Internship.id, Internship.department, Internship.location).order_by(Internship.id).all()
+        links = db.session.query(internship_skill.c.internship_id, internship_skill.c.skill_id).all()
+        return cls([r.id for r in rows], links, [r.department for r in rows], [r.location for r in rows])
+
+    def scores(self, skill_ids, department=None, location_counts=None, exclude_ids=()):
+        """Score of every internship for one student, -inf for excluded ones"""
+        overlap = np.zeros(len(self.ids), dtype=np.float32)
+        student_weight = np.float32(0)
+        for skill_id in set(skill_ids):
+            i = self.skill_index.get(skill_id)
+            if i is None:
+                student_weight += self.unseen_idf
+                continue
+            student_weight += self.idf[i]
+            overlap[self.postings[self.indptr[i]:self.indptr[i + 1]]] += self.idf[i]
+        union = student_weight + self.weight - overlap
+        jaccard = np.divide(overlap, union, out=np.zeros_like(overlap), where=union > 0)
+        score = SKILL_WEIGHT * jaccard
+
+        code = self.departments.get(_normalize(department), -1)
+        if code >= 0:
+            score += DEPARTMENT_WEIGHT * (self.department_codes == code)
+
+        if location_counts:
+            share = np.zeros(len(self.locations) + 1, dtype=np.float32)  # last slot: no location
+            total = sum(location_counts.values())
+            for location, count in location_counts.items():
+                code = self.locations.get(_normalize(location))
+                if code is not None:
+                    share[code] = count / total
+            score += LOCATION_WEIGHT * share[self.location_codes]
+
+        if exclude_ids:
+            exclude = np.fromiter(exclude_ids, dtype=np.int64)
+            positions = np.searchsorted(self.ids, exclude)
+            known = positions < len(self.ids)
+            positions, exclude = positions[known], exclude[known]
+            score[positions[self.ids[positions] == exclude]] = -np.inf
+        return score
+
+    def top_k(self, scores, k=TOP_K):
+        """(internship_id, score) pairs of the k best positive scores, best first"""
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(int(self.ids[i]), float(scores[i])) for i in best if scores[i] > 0]
+
+
+# --------------------------
+# Model cache, rebuilt when the internship table changes
+# --------------------------
+_model = None
+_model_lock = threading.Lock()
+
+
+def _fingerprint():
+    return tuple(db.session.query(row_count(Internship), db.func.max(Internship.id),
+                                  db.func.max(Internship.updated_at)).one())
+
+
+def current_model():
+    global _model
+    fingerprint = _fingerprint()
+    with _model_lock:
+        if _model is None or _model[0] != fingerprint:
+            _model = (fingerprint, RecommendationModel.load())
+        return _model[1]
+
+
+# --------------------------
+# Batch refresh
+# --------------------------
+def _student_features(student_ids):
+    skills, locations, applied = defaultdict(list), defaultdict(lambda: defaultdict(int)), defaultdict(set)
+    for profile_id, skill_id in (db.session.query(profile_skill.c.profile_id, profile_skill.c.skill_id)
+                                 .filter(profile_skill.c.profile_id.in_(student_ids))):
+        skills[profile_id].append(skill_id)
+    for student_id, internship_id, location in (db.session.query(Application.student_id, Application.internship_id,
+                                                                 Internship.location)
+                                                .join(Internship, Internship.id == Application.internship_id)
+                                                .filter(Application.student_id.in_(student_ids))):
+        applied[student_id].add(internship_id)
+        if location:
+            locations[student_id][location] += 1
+    departments = dict(db.session.query(Profile.id, Profile.department)
+                       .filter(Profile.id.in_(student_ids), Profile.role == 'student'))
+    return departments, skills, locations, applied
+
+
+def refresh_recommendations(student_ids, k=TOP_K, batch_size=500):
+    """Recompute and store the top-k internships for the given students"""
+    student_ids = sorted(set(student_ids))
+    if not student_ids:
+        return 0
+    model = current_model()
+    for start in range(0, len(student_ids), batch_size):
+        batch = student_ids[start:start + batch_size]
+        departments, skills, locations, applied = _student_features(batch)
+        now = datetime.utcnow()
+        rows = []
+        for student_id in departments:  # deleted profiles and employers drop out here
+            scores = model.scores(skills[student_id], departments[student_id], locations[student_id],
+                                  applied[student_id])
+            rows.extend({'student_id': student_id, 'internship_id': internship_id, 'score': score,
+                         'created_at': now} for internship_id, score in model.top_k(scores, k))
+        db.session.execute(db.delete(Recommendation).where(Recommendation.student_id.in_(batch)))
+        if rows:
+            db.session.execute(db.insert(Recommendation), rows)
+        db.session.commit()
+    return len(student_ids)
+
+
+def affected_students(internship_id):
+    """Students whose top-k an internship change can alter: shared skill, same department, or already listed"""
+    department = db.session.query(Internship.department).filter_by(id=internship_id).scalar()
+    queries = [
+        db.select(profile_skill.c.profile_id)
+        .join(internship_skill, internship_skill.c.skill_id == profile_skill.c.skill_id)
+        .where(internship_skill.c.internship_id == internship_id),
+        db.select(Recommendation.student_id).where(Recommendation.internship_id == internship_id),
+    ]
+    if _normalize(department):
+        queries.append(db.select(Profile.id).where(Profile.role == 'student',
+                                                   db.func.lower(db.func.trim(Profile.department)) == _normalize(department)))
+    return [id for (id,) in db.session.execute(db.union(*queries))]
+
+
+@task('refresh_recommendations')
+def refresh_recommendations_task(student_ids=None, internship_id=None):
+    if internship_id is not None:
+        student_ids = affected_students(internship_id)
+    refresh_recommendations(student_ids or [])
+
+
+def recommended_internships(student_id, limit=6):
+    """Stored recommendations still open to the student, as (internship, score) pairs"""
+    applied = db.select(Application.internship_id).where(Application.student_id == student_id)
+    return (db.session.query(Internship, Recommendation.score)
+            .join(Recommendation, Recommendation.internship_id == Internship.id)
+            .filter(Recommendation.student_id == student_id, Internship.id.not_in(applied))
+            .order_by(Recommendation.score.desc(), Internship.id)
+            .limit(limit)
+            .all())
+
+
+@recommend_cli.command('refresh')
+@click.option('--batch-size', default=500, show_default=True, help="Students per transaction.")
+@click.option('--top-k', default=TOP_K, show_default=True)
+def refresh_command(batch_size, top_k):
+    """Recompute recommendations for every student."""
+    student_ids = [id for (id,) in db.session.query(Profile.id).filter(Profile.role == 'student')]
+    refresh_recommendations(student_ids, k=top_k, batch_size=batch_size)
+    click.echo(f"Refreshed recommendations for {len(student_ids)} students.")
@@ -1,7 +1,27 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from .models import db, Profile, Internship, Application, TechnicalQuestion, get_random_general_questions
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, abort, Response, stream_with_context, current_app
+from .models import (db, Profile, Internship, Application, TechnicalQuestion, QuestionBank, Skill, Recommendation,
+                     profile_skill)
+from .auth import hash_password, load_reset_token, login_guard
+from .counters import adjust_row_count, discount_applications, record_application, row_count
+from .analytics import (applicants_by_day, by_department, last_refreshed, rollup_scope, score_distribution,
+                        recount_rollups, rollup_days, summarize, totals_by_internship)
+from .matching import match_internships, skills_from_form
+from .pagination import page_size, paginate
+from .fragments import fragments
+from .jobs import enqueue
+from .recommend import recommended_internships
+from .questions import apply_bank, question_banks, questions_from_form, save_bank, sync_questions
+from .quizbank import quiz_banks, build_quiz, sign_quiz, load_quiz, grade_quiz, passing_answers, PASS_MARK
+from .querycount import query_budget
+from .search import search_internships, index_internships, remove_internships
+from .instrumentation import render_metrics
+from .httpcache import conditional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from datetime import datetime
+import csv
+import json
+import time
 
 main = Blueprint('main', __name__)
 
@@ -20,6 +40,42 @@ def login_required(role=None):
         return wrapped
     return decorator
 
+# --------------------------
+# Helper: insert an application, the unique (student_id, internship_id) index rejects duplicates
+# --------------------------
+def submit_application(application):
+    """False when the student already applied, 404 when the internship does not exist"""
+    db.session.add(application)
+    try:
+        db.session.flush()
+        record_application(application)
+        # Follow-up work runs in `flask jobs work`, committed together with the application
+        enqueue('application_submitted', {'application_id': application.id},
+                key=f'application_submitted:{application.id}')
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        # Either the unique index ("already applied") or the internship foreign key
+        # (deleted meanwhile, or never existed). Anything else is a real error.
+        duplicate, internship = db.session.execute(db.select(
+            db.select(Application.id).filter_by(student_id=application.student_id,
+                                                internship_id=application.internship_id).exists(),
+            db.select(Internship.id).filter_by(id=application.internship_id).exists(),
+        )).one()
+        if duplicate:
+            return False
+        if not internship:
+            abort(404)
+        raise
+    return True
+
+# --------------------------
+# Helper: newest of several timestamps, for Last-Modified
+# --------------------------
+def latest(*timestamps):
+    timestamps = [t for t in timestamps if t is not None]
+    return max(timestamps) if timestamps else None
+
 # --------------------------
 # Home
 # --------------------------
@@ -35,7 +91,7 @@ def index():
 def register():
     if request.method == 'POST':
         full_name = request.form.get('full_name')
-        email = request.form.get('email')
+        email = (request.form.get('email') or '').strip()
         password = request.form.get('password')
         role = request.form.get('role')
 
@@ -56,26 +112,29 @@ def register():
         # For students
         department = request.form.get('department') if role == 'student' else None
         skills_input = request.form.get('skills') if role == 'student' else None
-        skills_list = [s.strip() for s in skills_input.split(',')] if skills_input else []
 
         # For employers
         company_name = request.form.get('company_name') if role == 'employer' else None
 
-        # Hash password safely
-        hashed_password = generate_password_hash(password, method='scrypt')
+        # Hash password safely, cost parameters come from PASSWORD_HASH_METHOD
+        hashed_password = hash_password(password)
 
         # Create profile with email
         new_profile = Profile(
             role=role,
             full_name=full_name,
             email=email,  # Added email
+            password_hash=hashed_password,
             department=department,
-            skills=skills_list,
+            skills=skills_from_form(skills_input),
             company_name=company_name,
         )
 
         try:
             db.session.add(new_profile)
+            if role == 'student':
+                db.session.flush()
+                enqueue('refresh_recommendations', {'student_ids': [new_profile.id]})
             db.session.commit()
             flash("Registration successful! Please login with your credentials.", "success")
             return redirect(url_for('main.login'))
@@ -93,23 +152,30 @@ def register():
 @main.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
-        full_name = request.form.get('full_name')
+        email = (request.form.get('email') or '').strip()
         password = request.form.get('password')
         
         # Validate input
-        if not full_name or not password:
-            flash("Please enter both name and password.", "warning")
+        if not email or not password:
+            flash("Please enter both email and password.", "warning")
             return redirect(url_for('main.login'))
-        
-        # Find user
-        profile = Profile.query.filter_by(full_name=full_name).first()
-        
-        if not profile:
-            flash("User not found. Please check your name or register first.", "danger")
+
+        # Refuse bursts of failures before spending any time on scrypt
+        if login_guard.is_blocked(email, request.remote_addr):
+            flash("Too many failed sign-in attempts. Please wait a few minutes and try again.", "danger")
             return redirect(url_for('main.login'))
         
-        # For now, we're not checking password (MVP mode)
-        # In production, you'd check: check_password_hash(profile.password_hash, password)
+        # Find user by the unique (indexed) email
+        profile = Profile.query.filter_by(email=email).first()
+
+        # Accounts without a stored hash (older or bulk-imported ones) never match,
+        # they set a password through the reset link instead
+        if not profile or not login_guard.check(profile, password):
+            login_guard.record_failure(email, request.remote_addr)
+            flash("Invalid email or password.", "danger")
+            return redirect(url_for('main.login'))
+
+        login_guard.record_success(email)
         
         # Set session
         session['user_id'] = profile.id
@@ -126,6 +192,64 @@ def login():
     return render_template("login.html")
 
 
+# --------------------------
+# Password reset
+# --------------------------
+@main.route('/forgot-password', methods=['GET', 'POST'])
+def forgot_password():
+    if request.method == 'POST':
+        email = (request.form.get('email') or '').strip()
+        profile = Profile.query.filter_by(email=email).first()
+        reset_url = _reset_url()
+        if profile and reset_url:
+            # At most one link per account every five minutes
+            enqueue('password_reset', {'profile_id': profile.id, 'reset_url': reset_url},
+                    key=f'password_reset:{profile.id}:{int(time.time() // 300)}')
+            db.session.commit()
+        # Same answer either way, so the form does not reveal which emails have accounts
+        flash("If an account uses that email, a link to set a new password is on its way.", "info")
+        return redirect(url_for('main.login'))
+
+    return render_template('forgot_password.html')
+
+
+def _reset_url():
+    """Absolute reset link on APP_BASE_URL (or SERVER_NAME), None when neither is set outside debug and testing.
+
+    The request's Host header is client controlled, a link built on it could
+    send the token to someone else's server.
+    """
+    base = current_app.config.get('APP_BASE_URL')
+    if base:
+        return base.rstrip('/') + url_for('main.reset_password')
+    if current_app.config.get('SERVER_NAME') or current_app.debug or current_app.testing:
+        return url_for('main.reset_password', _external=True)
+    current_app.logger.error("APP_BASE_URL is not set, password reset links are not sent")
+    return None
+
+
+@main.route('/reset-password', methods=['GET', 'POST'])
+def reset_password():
+    token = request.values.get('token')
+    profile = load_reset_token(token)
+    if profile is None:
+        flash("That link is invalid or has expired. Please ask for a new one.", "warning")
+        return redirect(url_for('main.forgot_password'))
+
+    if request.method == 'POST':
+        password = request.form.get('password')
+        if not password or password != request.form.get('confirm_password'):
+            flash("Enter the same new password twice.", "warning")
+            return redirect(url_for('main.reset_password', token=token))
+        profile.password_hash = hash_password(password)
+        db.session.commit()
+        login_guard.record_success(profile.email)
+        flash("Password set. Please login with your new password.", "success")
+        return redirect(url_for('main.login'))
+
+    return render_template('reset_password.html', token=token)
+
+
 # --------------------------
 # Logout
 # --------------------------
@@ -138,7 +262,31 @@ def logout():
 # --------------------------
 # Student Dashboard
 # --------------------------
+def student_dashboard_version():
+    """Everything the student dashboard shows, as counts and newest timestamps, in one query"""
+    student_id = session.get('user_id')
+    if not student_id:
+        return None
+    row = db.session.execute(
+        db.select(
+            Profile.role,
+            Profile.updated_at,
+            row_count(Internship),
+            db.select(db.func.max(Internship.updated_at)).scalar_subquery(),
+            db.select(db.func.count(Application.id)).where(Application.student_id == student_id).scalar_subquery(),
+            db.select(db.func.max(Application.applied_at)).where(Application.student_id == student_id).scalar_subquery(),
+            db.select(db.func.max(Recommendation.created_at))
+            .where(Recommendation.student_id == student_id).scalar_subquery(),
+        ).where(Profile.id == student_id)
+    ).first()
+    if row is None or row[0] != 'student':
+        return None
+    return tuple(row), latest(row[1], row[3], row[5], row[6])
+
+
 @main.route('/student/dashboard')
+@query_budget(9)
+@conditional(student_dashboard_version)
 def student_dashboard():
     student_id = session.get('user_id')
     if not student_id:
@@ -150,27 +298,54 @@ def student_dashboard():
         flash("Access denied.", "danger")
         return redirect(url_for('main.login'))
 
-    internships = Internship.query.all()
-    matched = []
-    for internship in internships:
-        if internship.required_skills:
-            score = len(set(student.skills) & set(internship.required_skills))
-        else:
-            score = 0
-        matched.append((internship, score))
-
-    matched.sort(key=lambda x: x[1], reverse=True)
+    # Ranked in SQL through the skill index, only internships sharing a skill are read
+    page = match_internships(
+        student,
+        per_page=page_size(request.args.get('per_page', type=int)),
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+    )
 
     # Get applications with quiz status
-    applications = Application.query.filter_by(student_id=student_id).all()
+    applications = (Application.query.options(joinedload(Application.internship))
+                    .filter_by(student_id=student_id).all())
     applied_ids = [app.internship_id for app in applications]
 
+    # Precomputed by the refresh_recommendations job, empty until it has run for this student
+    recommendations = recommended_internships(student_id)
+
     return render_template('student_dashboard.html', 
                          student=student, 
-                         matched=matched, 
+                         recommendations=recommendations,
+                         matched=page.items, 
+                         page=page,
                          applications=applications,
                          applied_ids=applied_ids)
 
+# --------------------------
+# Search internships
+# --------------------------
+@main.route('/search')
+def search():
+    if not session.get('user_id'):
+        flash("Please login first.", "warning")
+        return redirect(url_for('main.login'))
+
+    q = request.args.get('q', '').strip()
+    page = search_internships(
+        q,
+        per_page=page_size(request.args.get('per_page', type=int)),
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+    )
+    applied_ids = []
+    if session.get('role') == 'student' and page.items:
+        applied_ids = [internship_id for (internship_id,) in db.session.query(Application.internship_id).filter(
+            Application.student_id == session['user_id'],
+            Application.internship_id.in_([internship.id for internship in page.items]),
+        )]
+    return render_template('search.html', q=q, page=page, results=page.items, applied_ids=applied_ids)
+
 @main.route('/student/edit', methods=['GET', 'POST'])
 def edit_student():
     student_id = session.get('user_id')
@@ -180,7 +355,10 @@ def edit_student():
         student.full_name = request.form.get('full_name')
         student.department = request.form.get('department')
         skills_input = request.form.get('skills')
-        student.skills = [s.strip() for s in skills_input.split(',')] if skills_input else []
+        student.skills = skills_from_form(skills_input)
+        # Skill changes alone don't UPDATE the profile row, bump the fragment version explicitly
+        student.updated_at = datetime.utcnow()
+        enqueue('refresh_recommendations', {'student_ids': [student.id]})
         try:
             db.session.commit()
             flash("Profile updated!", "success")
@@ -193,11 +371,18 @@ def edit_student():
     return render_template('edit_student.html', student=student)
 
 @main.route('/student/delete', methods=['POST'])
+@login_required('student')
 def delete_student():
     student_id = session.get('user_id')
-    student = Profile.query.get(student_id)
     try:
-        db.session.delete(student)
+        # Applications, skills and recommendations go with ON DELETE CASCADE,
+        # the counters they fed are adjusted first and the rollup days recounted after
+        applications = Application.student_id == student_id
+        discount_applications(applications)
+        days = rollup_days(applications)
+        # The role check keeps an employer's postings out of this cascade even with a stale session
+        db.session.execute(db.delete(Profile).where(Profile.id == student_id, Profile.role == 'student'))
+        recount_rollups(days)
         db.session.commit()
         session.pop('user_id', None)
         flash("Profile deleted.", "success")
@@ -223,15 +408,11 @@ def apply(internship_id):
         flash("Please login first.", "warning")
         return redirect(url_for('main.login'))
 
-    # Check if already applied
-    existing = Application.query.filter_by(student_id=student_id, internship_id=internship_id).first()
-    if existing:
+    new_app = Application(student_id=student_id, internship_id=internship_id)
+    if not submit_application(new_app):
         flash("You already applied to this internship.", "info")
         return redirect(url_for('main.student_dashboard'))
 
-    new_app = Application(student_id=student_id, internship_id=internship_id)
-    db.session.add(new_app)
-    db.session.commit()
     flash("Application submitted!", "success")
     return redirect(url_for('main.student_dashboard'))
 
@@ -240,7 +421,29 @@ def apply(internship_id):
 # Employer Dashboard
 # --------------------------
 
+def employer_dashboard_version():
+    """The employer's internships as count, newest change and total applicants, in one query"""
+    employer_id = session.get('user_id')
+    if not employer_id:
+        return None
+    internships = Internship.employer_id == employer_id
+    row = db.session.execute(
+        db.select(
+            Profile.role,
+            Profile.updated_at,
+            db.select(db.func.count(Internship.id)).where(internships).scalar_subquery(),
+            db.select(db.func.max(Internship.updated_at)).where(internships).scalar_subquery(),
+            db.select(db.func.sum(Internship.applicant_count)).where(internships).scalar_subquery(),
+        ).where(Profile.id == employer_id)
+    ).first()
+    if row is None or row[0] != 'employer':
+        return None
+    return tuple(row), latest(row[1], row[3])
+
+
 @main.route('/employer/dashboard')
+@query_budget(5)
+@conditional(employer_dashboard_version)
 def employer_dashboard():
     employer_id = session.get('user_id')
     if not employer_id:
@@ -253,8 +456,15 @@ def employer_dashboard():
         return redirect(url_for('main.login'))
 
     # Changed from company_id to employer_id
-    internships = Internship.query.filter_by(employer_id=employer.id).all()
-    return render_template('employer_dashboard.html', employer=employer, internships=internships)
+    page = paginate(
+        Internship.query.filter_by(employer_id=employer.id),
+        order_by=[Internship.created_at, Internship.id],
+        key=lambda internship: (internship.created_at, internship.id),
+        per_page=page_size(request.args.get('per_page', type=int)),
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+    )
+    return render_template('employer_dashboard.html', employer=employer, internships=page.items, page=page)
 
 
 # Post new internship
@@ -269,17 +479,20 @@ def post_internship():
         department = request.form.get('department')
         location = request.form.get('location')
         skills_input = request.form.get('skills')
-        required_skills = [s.strip() for s in skills_input.split(',')] if skills_input else []
 
         new_internship = Internship(
             title=title,
             description=description,
             department=department,
             location=location,
-            required_skills=required_skills,
+            required_skills=skills_from_form(skills_input),
             employer_id=employer.id  # Changed from company_id
         )
         db.session.add(new_internship)
+        db.session.flush()
+        adjust_row_count(Internship, 1)
+        index_internships([new_internship.id])
+        enqueue('refresh_recommendations', {'internship_id': new_internship.id})
         db.session.commit()
         flash("Internship posted! Now add technical questions.", "success")
         return redirect(url_for('main.manage_questions', internship_id=new_internship.id))
@@ -304,8 +517,14 @@ def edit_internship(id):
         internship.department = request.form.get('department')
         internship.location = request.form.get('location')
         skills_input = request.form.get('skills')
-        internship.required_skills = [s.strip() for s in skills_input.split(',')] if skills_input else []
+        internship.required_skills = skills_from_form(skills_input)
+        internship.updated_at = datetime.utcnow()
+        db.session.flush()
+        index_internships([internship.id])
+        enqueue('refresh_recommendations', {'internship_id': internship.id})
         db.session.commit()
+        quiz_banks.invalidate(internship.id)
+        fragments.invalidate('internship', [internship.id])
         flash("Internship updated!", "success")
         return redirect(url_for('main.employer_dashboard'))
 
@@ -315,22 +534,50 @@ def edit_internship(id):
 # Delete internship
 @main.route('/employer/delete/<int:id>', methods=['POST'])
 def delete_internship(id):
-    internship = Internship.query.get_or_404(id)
+    owner_id = db.first_or_404(db.select(Internship.employer_id).where(Internship.id == id))
     employer_id = session.get('user_id')
 
     # Changed from company_id to employer_id
-    if internship.employer_id != employer_id:
+    if owner_id != employer_id:
         flash("Unauthorized access.", "danger")
         return redirect(url_for('main.employer_dashboard'))
 
-    db.session.delete(internship)
+    # Students who had it recommended get a replacement once the worker catches up
+    listed = [student_id for (student_id,) in db.session.query(Recommendation.student_id).filter_by(internship_id=id)]
+    if listed:
+        enqueue('refresh_recommendations', {'student_ids': listed})
+    # Questions, applications, skills, recommendations and rollups go with ON DELETE CASCADE
+    result = db.session.execute(db.delete(Internship).where(Internship.id == id))
+    adjust_row_count(Internship, -result.rowcount)
+    remove_internships([id])
     db.session.commit()
+    quiz_banks.invalidate(id)
+    fragments.invalidate('internship', [id])
     flash("Internship deleted.", "info")
     return redirect(url_for('main.employer_dashboard'))
 
 
 # View applicants for an internship
+def applicants_version(id):
+    """The internship's counters plus its newest application and applicant profile change, in one query"""
+    row = db.session.execute(
+        db.select(
+            Internship.employer_id, Internship.updated_at, Internship.applicant_count,
+            Internship.passed_count, Internship.score_total,
+            db.select(db.func.max(Application.applied_at)).where(Application.internship_id == id).scalar_subquery(),
+            db.select(db.func.max(Profile.updated_at))
+            .join(Application, Application.student_id == Profile.id)
+            .where(Application.internship_id == id).scalar_subquery(),
+        ).where(Internship.id == id)
+    ).first()
+    if row is None or row[0] != session.get('user_id'):
+        return None
+    return tuple(row), latest(row[1], row[5], row[6])
+
+
 @main.route('/employer/applicants/<int:id>')
+@query_budget(5)
+@conditional(applicants_version)
 def view_applicants(id):
     internship = Internship.query.get_or_404(id)
     employer_id = session.get('user_id')
@@ -340,8 +587,124 @@ def view_applicants(id):
         flash("Unauthorized access.", "danger")
         return redirect(url_for('main.employer_dashboard'))
 
-    applications = Application.query.filter_by(internship_id=id).all()
-    return render_template('view_applicants.html', internship=internship, applications=applications)
+    # Students are joined in and their skills selectin-loaded, so rendering issues no per-row queries
+    page = paginate(
+        Application.query.options(joinedload(Application.student)).filter_by(internship_id=id),
+        order_by=[Application.applied_at, Application.id],
+        key=lambda app: (app.applied_at, app.id),
+        per_page=page_size(request.args.get('per_page', type=int)),
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+    )
+    return render_template('view_applicants.html', internship=internship, applications=page.items, page=page)
+
+
+# Export applicants for an internship (streamed CSV or JSONL)
+EXPORT_FIELDS = ['full_name', 'email', 'department', 'skills', 'applied_at', 'quiz_score', 'quiz_passed']
+EXPORT_BATCH_SIZE = 500
+
+class _EchoWriter:
+    """File-like object for csv.writer that hands each formatted line back instead of storing it"""
+    def write(self, value):
+        return value
+
+def _applicant_rows(internship_id):
+    # yield_per streams from a server-side cursor, skills are fetched once per batch
+    query = (db.select(Profile.id, Profile.full_name, Profile.email, Profile.department,
+                       Application.applied_at, Application.quiz_score, Application.quiz_passed)
+             .join(Profile, Profile.id == Application.student_id)
+             .where(Application.internship_id == internship_id)
+             .order_by(Application.applied_at, Application.id)
+             .execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for batch in db.session.execute(query).partitions():
+        skills = {}
+        skill_rows = (db.session.query(profile_skill.c.profile_id, Skill.name)
+                      .join(Skill, Skill.id == profile_skill.c.skill_id)
+                      .filter(profile_skill.c.profile_id.in_([row.id for row in batch]))
+                      .order_by(Skill.name))
+        for profile_id, name in skill_rows:
+            skills.setdefault(profile_id, []).append(name)
+        for row in batch:
+            yield {
+                'full_name': row.full_name,
+                'email': row.email,
+                'department': row.department,
+                'skills': skills.get(row.id, []),
+                'applied_at': row.applied_at.isoformat() if row.applied_at else None,
+                'quiz_score': row.quiz_score,
+                'quiz_passed': bool(row.quiz_passed),
+            }
+
+@main.route('/employer/applicants/<int:id>/export')
+def export_applicants(id):
+    internship = Internship.query.get_or_404(id)
+    employer_id = session.get('user_id')
+
+    if internship.employer_id != employer_id:
+        flash("Unauthorized access.", "danger")
+        return redirect(url_for('main.employer_dashboard'))
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'jsonl'):
+        abort(400)
+
+    def generate():
+        rows = _applicant_rows(id)
+        if fmt == 'jsonl':
+            for row in rows:
+                yield json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n'
+            return
+        writer = csv.writer(_EchoWriter())
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            row['skills'] = ', '.join(row['skills'])
+            yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+    mimetype = 'application/x-ndjson' if fmt == 'jsonl' else 'text/csv'
+    filename = f"applicants-{id}.{fmt}"
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
+# --------------------------
+# Employer analytics, read from the daily rollups kept by `flask analytics refresh`
+# --------------------------
+ANALYTICS_DAYS = (7, 30, 90)
+
+@main.route('/employer/analytics')
+@query_budget(7)
+def employer_analytics():
+    employer_id = session.get('user_id')
+    if not employer_id or session.get('role') != 'employer':
+        flash("Please login as an employer.", "warning")
+        return redirect(url_for('main.login'))
+
+    internships = (db.session.query(Internship.id, Internship.title)
+                   .filter_by(employer_id=employer_id).order_by(Internship.created_at.desc()).all())
+    selected = request.args.get('internship', type=int)
+    if selected not in {internship.id for internship in internships}:
+        selected = None
+    days = request.args.get('days', 30, type=int)
+    if days not in ANALYTICS_DAYS:
+        days = 30
+
+    totals = totals_by_internship(employer_id)
+    chosen = [totals[selected]] if selected in totals else [] if selected else list(totals.values())
+    overall = summarize(*(sum(total[name] for total in chosen) for name in ('applicants', 'passed', 'score_total')))
+    scope = rollup_scope(employer_id, selected)
+    daily = applicants_by_day(scope, days)
+    return render_template('employer_analytics.html',
+                           internships=internships,
+                           totals=totals,
+                           overall=overall,
+                           selected=selected,
+                           days=days,
+                           day_options=ANALYTICS_DAYS,
+                           daily=daily,
+                           peak=max([count for _, count in daily] + [1]),
+                           distribution=score_distribution(scope),
+                           departments=by_department(scope),
+                           refreshed_at=last_refreshed())
 
 
 # --------------------------
@@ -354,29 +717,25 @@ def take_quiz(internship_id):
         flash("Please login first.", "warning")
         return redirect(url_for('main.login'))
 
-    internship = Internship.query.get_or_404(internship_id)
-    
-    # Check if already applied
-    existing = Application.query.filter_by(student_id=student_id, internship_id=internship_id).first()
-    if existing:
-        flash("You already applied to this internship.", "info")
-        return redirect(url_for('main.student_dashboard'))
+    bank = quiz_banks.get(internship_id)
+    if bank is None:
+        abort(404)
 
     if request.method == 'POST':
-        # Calculate score
-        total_questions = 8
-        correct_answers = 0
-        
-        # Check answers
-        for i in range(total_questions):
-            student_answer = request.form.get(f'q{i}')
-            correct_answer = request.form.get(f'correct_{i}')
-            
-            if student_answer == correct_answer:
-                correct_answers += 1
-        
-        score = (correct_answers / total_questions) * 100
-        passed = score >= 75  # 75% passing grade (6 out of 8)
+        # Grade against the server-side answers for the questions that were actually served
+        keys = load_quiz(request.form.get('quiz_token'), student_id, internship_id)
+        if keys is None:
+            flash("This quiz has expired. Please take it again.", "warning")
+            return redirect(url_for('main.take_quiz', internship_id=internship_id))
+
+        responses = [request.form.get(f'q{i}') for i in range(len(keys))]
+        correct_answers = grade_quiz(bank, keys, responses)
+        if correct_answers is None:
+            flash("The questions for this internship have changed. Please take the quiz again.", "warning")
+            return redirect(url_for('main.take_quiz', internship_id=internship_id))
+
+        score = (correct_answers / len(keys)) * 100
+        passed = score >= PASS_MARK
         
         # Create application
         new_app = Application(
@@ -385,50 +744,34 @@ def take_quiz(internship_id):
             quiz_passed=passed,
             quiz_score=int(score)
         )
-        db.session.add(new_app)
-        db.session.commit()
+        if not submit_application(new_app):
+            flash("You already applied to this internship.", "info")
+            return redirect(url_for('main.student_dashboard'))
         
         if passed:
             flash(f"Congratulations! You passed with {int(score)}%. Your application has been submitted.", "success")
         else:
-            flash(f"You scored {int(score)}%. You need at least 75% to apply. Please try again later.", "warning")
+            flash(f"You scored {int(score)}%. You need at least {PASS_MARK}% to apply. Please try again later.", "warning")
         
         return redirect(url_for('main.student_dashboard'))
     
-    # GET request - show quiz
-    # Get 4 random general questions
-    general_questions = get_random_general_questions(4)
-    
-    # Get 4 random technical questions from this internship
-    all_technical = TechnicalQuestion.query.filter_by(internship_id=internship_id).all()
-    
-    if len(all_technical) < 4:
+    # GET request - show quiz, unless already applied
+    existing = Application.query.filter_by(student_id=student_id, internship_id=internship_id).first()
+    if existing:
+        flash("You already applied to this internship.", "info")
+        return redirect(url_for('main.student_dashboard'))
+
+    # Questions come from the cached quiz bank, no question rows are read here
+    if len(bank.technical) < 4:
         flash("This internship doesn't have enough technical questions set up yet.", "warning")
         return redirect(url_for('main.student_dashboard'))
+
+    all_questions = build_quiz(bank, general_count=4, technical_count=4)
     
-    import random
-    technical_questions = random.sample(all_technical, min(4, len(all_technical)))
-    
-    # Combine questions
-    all_questions = []
-    for q in general_questions:
-        all_questions.append({
-            'question': q['question'],
-            'answer': 'yes' if q['answer'] else 'no',
-            'notes': q['notes']
-        })
-    
-    for q in technical_questions:
-        all_questions.append({
-            'question': q.question,
-            'answer': 'yes' if q.correct_answer else 'no',
-            'notes': q.notes
-        })
-    
-    # Shuffle all questions
-    random.shuffle(all_questions)
-    
-    return render_template('quiz.html', internship=internship, questions=all_questions)
+    return render_template('quiz.html', internship=bank, questions=all_questions,
+                           quiz_token=sign_quiz(student_id, internship_id, all_questions),
+                           pass_mark=PASS_MARK,
+                           passing_answers=passing_answers(len(all_questions)))
 
 
 # --------------------------
@@ -445,28 +788,79 @@ def manage_questions(internship_id):
         return redirect(url_for('main.employer_dashboard'))
     
     if request.method == 'POST':
-        # Delete existing questions
-        TechnicalQuestion.query.filter_by(internship_id=internship_id).delete()
-        
-        # Add new questions (expect 8 questions)
-        for i in range(1, 9):
-            question_text = request.form.get(f'question_{i}')
-            answer = request.form.get(f'answer_{i}')
-            notes = request.form.get(f'notes_{i}', '')
-            
-            if question_text and answer:
-                new_q = TechnicalQuestion(
-                    internship_id=internship_id,
-                    question=question_text,
-                    correct_answer=(answer == 'yes'),
-                    notes=notes
-                )
-                db.session.add(new_q)
-        
+        # Unchanged questions are left alone and keep their ids
+        added, changed, removed = sync_questions(internship_id, questions_from_form(request.form))
         db.session.commit()
-        flash("Technical questions updated successfully!", "success")
+        quiz_banks.invalidate(internship_id)
+        flash(f"Technical questions saved: {added} added, {changed} changed, {removed} removed.", "success")
         return redirect(url_for('main.employer_dashboard'))
     
     # GET - show existing questions
-    questions = TechnicalQuestion.query.filter_by(internship_id=internship_id).all()
-    return render_template('manage_questions.html', internship=internship, questions=questions)
\ No newline at end of file
+    questions = TechnicalQuestion.query.filter_by(internship_id=internship_id).order_by(TechnicalQuestion.id).all()
+    return render_template('manage_questions.html', internship=internship, questions=questions,
+                           banks=question_banks(employer_id))
+
+
+@main.route('/employer/questions/<int:internship_id>/bank', methods=['POST'])
+def save_question_bank(internship_id):
+    """Save the internship's questions as a reusable bank"""
+    employer_id = session.get('user_id')
+    internship = Internship.query.get_or_404(internship_id)
+    if internship.employer_id != employer_id:
+        flash("Unauthorized access.", "danger")
+        return redirect(url_for('main.employer_dashboard'))
+
+    name = request.form.get('name', '').strip()[:100]
+    if not name:
+        flash("Give the question bank a name.", "warning")
+    elif not TechnicalQuestion.query.filter_by(internship_id=internship_id).count():
+        flash("Save some questions first.", "warning")
+    else:
+        save_bank(employer_id, name, internship_id)
+        db.session.commit()
+        flash(f"Saved the questions as \"{name}\".", "success")
+    return redirect(url_for('main.manage_questions', internship_id=internship_id))
+
+
+@main.route('/employer/questions/<int:internship_id>/apply', methods=['POST'])
+def apply_question_bank(internship_id):
+    """Add the questions of one of the employer's banks to the internship"""
+    employer_id = session.get('user_id')
+    internship = Internship.query.get_or_404(internship_id)
+    if internship.employer_id != employer_id:
+        flash("Unauthorized access.", "danger")
+        return redirect(url_for('main.employer_dashboard'))
+
+    bank = QuestionBank.query.filter_by(id=request.form.get('bank_id', type=int), employer_id=employer_id).first()
+    if bank is None:
+        flash("Pick one of your question banks.", "warning")
+        return redirect(url_for('main.manage_questions', internship_id=internship_id))
+    added = apply_bank(bank.id, internship_id)
+    db.session.commit()
+    quiz_banks.invalidate(internship_id)
+    flash(f"Added {added} questions from \"{bank.name}\".", "success")
+    return redirect(url_for('main.manage_questions', internship_id=internship_id))
+
+
+@main.route('/employer/question-banks/<int:bank_id>/delete', methods=['POST'])
+def delete_question_bank(bank_id):
+    bank = QuestionBank.query.get_or_404(bank_id)
+    if bank.employer_id != session.get('user_id'):
+        flash("Unauthorized access.", "danger")
+        return redirect(url_for('main.employer_dashboard'))
+
+    db.session.execute(db.delete(QuestionBank).where(QuestionBank.id == bank_id))
+    db.session.commit()
+    flash(f"Deleted the question bank \"{bank.name}\".", "info")
+    internship_id = request.form.get('internship_id', type=int)
+    if internship_id:
+        return redirect(url_for('main.manage_questions', internship_id=internship_id))
+    return redirect(url_for('main.employer_dashboard'))
+
+
+# --------------------------
+# Metrics (Prometheus text format)
+# --------------------------
+@main.route('/metrics')
+def metrics():
+    return render_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
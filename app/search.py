@@ -0,0 +1,162 @@
+import re
+
+import click
+import sqlalchemy as sa
+from flask.cli import AppGroup
+from sqlalchemy.dialects import postgresql
+
+from .models import db, Internship
+from .pagination import DEFAULT_PER_PAGE, Page, paginate
+
+search_cli = AppGroup('search', help="Maintain the internship full-text index.")
+
+# The search index lives outside db.metadata so create_all() never tries to
+# build it as a plain table; each backend creates it with its own DDL.
+search_metadata = sa.MetaData()
+
+# SQLite: FTS5 virtual table, rowid is the internship id
+internship_fts = sa.Table(
+    'internship_fts', search_metadata,
+    sa.Column('rowid', sa.Integer, primary_key=True),
+    sa.Column('title', sa.Text),
+    sa.Column('description', sa.Text),
+    sa.Column('location', sa.Text),
+    sa.Column('department', sa.Text),
+)
+
+# Postgres: precomputed, weighted tsvector per internship behind a GIN index
+internship_search = sa.Table(
+    'internship_search', search_metadata,
+    sa.Column('internship_id', sa.Integer, primary_key=True),
+    sa.Column('document', postgresql.TSVECTOR),
+)
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS internship_fts USING fts5("
+    "title, description, location, department, tokenize='unicode61 remove_diacritics 2')",
+]
+POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS internship_search ("
+    "internship_id INTEGER PRIMARY KEY REFERENCES internship (id) ON DELETE CASCADE, "
+    "document TSVECTOR NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_internship_search_document ON internship_search USING GIN (document)",
+]
+
+# Column weights: a hit in the title counts most, then location/department, then description
+SQLITE_WEIGHTS = (10.0, 1.0, 2.0, 2.0)
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(location, '') || ' ' || coalesce(department, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+
+def _dialect():
+    return db.engine.dialect.name
+
+
+def create_search_index():
+    """Create the backend's search index if it does not exist yet"""
+    ddl = {'sqlite': SQLITE_DDL, 'postgresql': POSTGRES_DDL}.get(_dialect(), [])
+    with db.engine.begin() as conn:
+        for statement in ddl:
+            conn.execute(sa.text(statement))
+
+
+def index_internships(ids):
+    """(Re)index the given internships inside the current transaction.
+
+    Runs as one delete plus one INSERT ... SELECT, so it is as cheap for a
+    bulk import batch as it is for a single edit. Ids that no longer exist
+    are simply removed from the index.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        db.session.execute(internship_fts.delete().where(internship_fts.c.rowid.in_(ids)))
+        db.session.execute(internship_fts.insert().from_select(
+            ['rowid', 'title', 'description', 'location', 'department'],
+            sa.select(Internship.id, Internship.title,
+                      sa.func.coalesce(Internship.description, ''),
+                      sa.func.coalesce(Internship.location, ''),
+                      sa.func.coalesce(Internship.department, ''))
+            .where(Internship.id.in_(ids)),
+        ))
+    elif dialect == 'postgresql':
+        db.session.execute(internship_search.delete().where(internship_search.c.internship_id.in_(ids)))
+        db.session.execute(internship_search.insert().from_select(
+            ['internship_id', 'document'],
+            sa.select(Internship.id, sa.literal_column(POSTGRES_DOCUMENT)).where(Internship.id.in_(ids)),
+        ))
+
+
+def remove_internships(ids):
+    ids = list(ids)
+    if not ids:
+        return
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        db.session.execute(internship_fts.delete().where(internship_fts.c.rowid.in_(ids)))
+    elif dialect == 'postgresql':
+        db.session.execute(internship_search.delete().where(internship_search.c.internship_id.in_(ids)))
+
+
+def rebuild_search_index(batch_size=1000):
+    """Reindex every internship, batch_size rows per transaction"""
+    last_id = 0
+    while True:
+        ids = [id for (id,) in db.session.query(Internship.id)
+               .filter(Internship.id > last_id).order_by(Internship.id).limit(batch_size)]
+        if not ids:
+            break
+        index_internships(ids)
+        db.session.commit()
+        last_id = ids[-1]
+
+
+@search_cli.command('reindex')
+@click.option('--batch-size', default=1000, show_default=True)
+def reindex_command(batch_size):
+    """Create the search index if needed and rebuild it from the internship table."""
+    create_search_index()
+    rebuild_search_index(batch_size)
+    click.echo("Search index rebuilt.")
+
+
+def _terms(text):
+    return re.findall(r'\w+', text or '')[:16]
+
+
+def search_internships(text, per_page=DEFAULT_PER_PAGE, after=None, before=None):
+    """Ranked full-text search over title, description, location and department.
+
+    Every term must match (prefixes count, "pyth" finds "python"). Results
+    are keyset-paginated on (relevance, id).
+    """
+    terms = _terms(text)
+    dialect = _dialect()
+    if not terms or dialect not in ('sqlite', 'postgresql'):
+        return Page([], None, None)
+
+    if dialect == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        score = -sa.func.bm25(sa.literal_column('internship_fts'), *SQLITE_WEIGHTS)
+        query = (db.session.query(Internship, score.label('score'))
+                 .join(internship_fts, internship_fts.c.rowid == Internship.id)
+                 .filter(sa.text('internship_fts MATCH :match').bindparams(match=match)))
+    else:
+        tsquery = sa.func.to_tsquery('english', ' & '.join(f'{term}:*' for term in terms))
+        score = sa.func.ts_rank(internship_search.c.document, tsquery)
+        query = (db.session.query(Internship, score.label('score'))
+                 .join(internship_search, internship_search.c.internship_id == Internship.id)
+                 .filter(internship_search.c.document.op('@@')(tsquery)))
+
+    page = paginate(
+        query,
+        order_by=[score, Internship.id],
+        key=lambda row: (row.score, row[0].id),
+        per_page=per_page, after=after, before=before,
+    )
+    return page._replace(items=[row[0] for row in page.items])
@@ -0,0 +1,136 @@
+import logging
+import smtplib
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+import click
+from flask import current_app
+
+from .auth import reset_token
+from .jobs import enqueue, jobs_cli, task
+from .models import db, Application, Internship, Profile
+
+logger = logging.getLogger(__name__)
+
+DIGEST_MAX_PER_INTERNSHIP = 20
+
+
+def send_mail(to, subject, body):
+    """Send through MAIL_SERVER, or just log the message when no server is configured"""
+    server = current_app.config.get('MAIL_SERVER')
+    if not server:
+        logger.info("Mail to %s: %s\n%s", to, subject, body)
+        return
+    message = EmailMessage()
+    message['From'] = current_app.config['MAIL_SENDER']
+    message['To'] = to
+    message['Subject'] = subject
+    message.set_content(body)
+    with smtplib.SMTP(server, current_app.config.get('MAIL_PORT', 25), timeout=30) as smtp:
+        if current_app.config.get('MAIL_USE_TLS'):
+            smtp.starttls()
+        if current_app.config.get('MAIL_USERNAME'):
+            smtp.login(current_app.config['MAIL_USERNAME'], current_app.config['MAIL_PASSWORD'])
+        smtp.send_message(message)
+
+
+# --------------------------
+# Application submitted: confirmation to the student
+# --------------------------
+@task('application_submitted')
+def application_submitted(application_id):
+    row = (db.session.query(Application.quiz_score, Application.quiz_passed, Profile.email, Profile.full_name,
+                            Internship.title)
+           .join(Profile, Profile.id == Application.student_id)
+           .join(Internship, Internship.id == Application.internship_id)
+           .filter(Application.id == application_id)
+           .first())
+    if row is None:
+        return  # withdrawn or deleted since, nothing to confirm
+    result = "passed" if row.quiz_passed else "did not pass"
+    send_mail(row.email, f"Application received: {row.title}",
+              f"Hi {row.full_name},\n\n"
+              f"Your application for {row.title} was received. You scored {row.quiz_score}% and {result} the quiz.\n")
+
+
+# --------------------------
+# Password reset: link to set a new password
+# --------------------------
+@task('password_reset')
+def password_reset(profile_id, reset_url):
+    profile = db.session.get(Profile, profile_id)
+    if profile is None:
+        return
+    # The token is made here rather than queued, so it never sits in the job table
+    send_mail(profile.email, "Set your carreerbridge password",
+              f"Hi {profile.full_name},\n\n"
+              f"Follow this link to set a new password, it works once:\n{reset_url}?token={reset_token(profile)}\n\n"
+              f"If you did not ask for this, you can ignore this message.\n")
+
+
+# --------------------------
+# Employer digest: new applicants per internship since the previous digest
+# --------------------------
+@task('employer_digest')
+def employer_digest(employer_id, since, until):
+    employer = db.session.get(Profile, employer_id)
+    if employer is None:
+        return
+    since, until = datetime.fromisoformat(since), datetime.fromisoformat(until)
+    rows = (db.session.query(Internship.id, Internship.title, Profile.full_name, Application.quiz_score,
+                             Application.quiz_passed)
+            .join(Application, Application.internship_id == Internship.id)
+            .join(Profile, Profile.id == Application.student_id)
+            .filter(Internship.employer_id == employer_id,
+                    Application.applied_at >= since, Application.applied_at < until)
+            .order_by(Internship.id, Application.applied_at)
+            .all())
+    if not rows:
+        return
+
+    sections, current = [], None
+    for row in rows:
+        if current is None or current['id'] != row.id:
+            current = {'id': row.id, 'title': row.title, 'total': 0, 'passed': 0, 'lines': []}
+            sections.append(current)
+        current['total'] += 1
+        current['passed'] += bool(row.quiz_passed)
+        if len(current['lines']) < DIGEST_MAX_PER_INTERNSHIP:
+            status = "passed" if row.quiz_passed else "not passed"
+            current['lines'].append(f"  - {row.full_name}: {row.quiz_score}% ({status})")
+
+    body = [f"Hi {employer.full_name},", "", f"New applications since {since:%B %d, %Y %H:%M} UTC:", ""]
+    for section in sections:
+        body.append(f"{section['title']}: {section['total']} new, {section['passed']} passed the quiz")
+        body.extend(section['lines'])
+        if section['total'] > len(section['lines']):
+            body.append(f"  ... and {section['total'] - len(section['lines'])} more")
+        body.append("")
+    send_mail(employer.email, f"{len(rows)} new applications", '\n'.join(body))
+
+
+def enqueue_digests(period_hours=24, now=None):
+    """Queue one digest per employer that received applications in the last period.
+
+    The idempotency key is the period, so running this twice (two cron
+    hosts, a retried cron job) sends each digest once.
+    """
+    until = (now or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+    since = until - timedelta(hours=period_hours)
+    employer_ids = [id for (id,) in db.session.query(Internship.employer_id)
+                    .join(Application, Application.internship_id == Internship.id)
+                    .filter(Application.applied_at >= since, Application.applied_at < until)
+                    .distinct()]
+    for employer_id in employer_ids:
+        enqueue('employer_digest', {'employer_id': employer_id, 'since': since.isoformat(), 'until': until.isoformat()},
+                key=f'employer_digest:{employer_id}:{since:%Y%m%d%H}:{period_hours}')
+    db.session.commit()
+    return len(employer_ids)
+
+
+@jobs_cli.command('digest')
+@click.option('--hours', default=24, show_default=True, help="Length of the digest period, run this as often from cron.")
+def digest_command(hours):
+    """Queue employer digests for the period that just ended."""
+    count = enqueue_digests(hours)
+    click.echo(f"Queued digests for {count} employers.")
@@ -0,0 +1,436 @@
+"""Route benchmarks against a seeded database.
+
+    python -m benchmarks.bench                                   # small dataset, temporary SQLite file
+    python -m benchmarks.bench --employers 10000 --students 100000 \\
+        --internships 100000 --applications 1000000              # full scale, seeding takes a while
+    python -m benchmarks.bench --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench --baseline benchmarks/baseline.json   # exits 1 on a regression
+
+Every route of the main and /api/v1 blueprints, forms and their POSTs alike,
+is driven twice: sequentially through the Flask test client, which also
+records SQL statements and peak Python memory per request, and then
+concurrently over real HTTP against a threaded werkzeug server. Both phases
+report p50/p95/p99 latency per route. The delete routes are left out, they
+would eat the dataset the other scenarios address by id.
+
+Pass --database-url (and --no-seed on later runs) to benchmark against a
+persistent database, e.g. Postgres.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from sqlalchemy import event
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from app import create_app
+from app.auth import reset_token
+from app.models import db, Profile
+from app.quizbank import sign_quiz
+from .seed import (PASSWORD, BANK_NAME, Scale, applications_per_student, employer_of, existing_scale,
+                   internship_for, prepare_schema, question_id, seed, student_id)
+
+# One request of a scenario: who is logged in, and what is sent
+Call = namedtuple('Call', 'user_id role method path data')
+Result = namedtuple('Result', 'route phase count errors p50 p95 p99 queries peak_kib')
+
+
+# --------------------------
+# Scenarios, one per route; `n` is the iteration number
+# --------------------------
+class Scenarios:
+    def __init__(self, scale, app):
+        self.scale = scale
+        self.app = app  # signs quiz and password reset tokens
+        self.applied = applications_per_student(scale)
+        self._new_applications = itertools.count()
+        self._new_profiles = itertools.count()
+        self._lock = threading.Lock()
+
+    def student(self, n):
+        return student_id(self.scale, n), 'student'
+
+    def employer(self, n):
+        internship = n % self.scale.internships + 1
+        return employer_of(self.scale, internship), 'employer', internship
+
+    def _fresh_pair(self):
+        """A student and an internship they have not applied to yet"""
+        with self._lock:
+            k = next(self._new_applications)
+        student = k % self.scale.students
+        slot = self.applied + k // self.scale.students
+        return student_id(self.scale, student), internship_for(self.scale, student, slot % self.scale.internships)
+
+    def calls(self):
+        def as_student(method, path, data=None):
+            return lambda n: Call(*self.student(n), method, path(n) if callable(path) else path, data)
+
+        def as_employer(method, path, data=None):
+            def call(n):
+                user_id, role, internship = self.employer(n)
+                return Call(user_id, role, method, path.format(id=internship), data)
+            return call
+
+        def apply(n):
+            user_id, internship = self._fresh_pair()
+            return Call(user_id, 'student', 'GET', f'/apply/{internship}', None)
+
+        def submit_quiz(n):
+            # Four general and up to four technical questions, as take_quiz serves them
+            user_id, internship = self._fresh_pair()
+            keys = [f'g{k}' for k in range(4)]
+            keys += [f't{question_id(self.scale, internship, k)}' for k in range(min(4, self.scale.questions))]
+            with self.app.app_context():
+                token = sign_quiz(user_id, internship, [{'id': key} for key in keys])
+            data = {'quiz_token': token, **{f'q{i}': ('yes', 'no')[(n + i) % 2] for i in range(len(keys))}}
+            return Call(user_id, 'student', 'POST', f'/quiz/{internship}', data)
+
+        def register(n):
+            with self._lock:
+                k = next(self._new_profiles)
+            return Call(None, None, 'POST', '/register', {
+                'full_name': f'Bench Registrant {k}', 'email': f'registrant{k}@bench.test', 'password': PASSWORD,
+                'role': 'student', 'department': 'Computer Science', 'skills': 'Python, SQL',
+            })
+
+        def reset_password(method):
+            def call(n):
+                user_id = student_id(self.scale, n)
+                with self.app.app_context():
+                    token = reset_token(db.session.get(Profile, user_id))
+                    db.session.remove()
+                if method == 'GET':
+                    return Call(None, None, 'GET', '/reset-password?' + urlencode({'token': token}), None)
+                return Call(None, None, 'POST', '/reset-password',
+                            {'token': token, 'password': PASSWORD, 'confirm_password': PASSWORD})
+            return call
+
+        def apply_bank(n):
+            # Every question is already on the internship, so this measures the skip path
+            user_id, role, internship = self.employer(n)
+            return Call(user_id, role, 'POST', f'/employer/questions/{internship}/apply', {'bank_id': user_id})
+
+        def save_questions(n):
+            # The seeded questions resubmitted with one of them reworded: one UPDATE on the diff path
+            user_id, role, internship = self.employer(n)
+            data = {}
+            for k in range(self.scale.questions):
+                data[f'id_{k + 1}'] = question_id(self.scale, internship, k)
+                data[f'question_{k + 1}'] = f'Question {k + 1} for internship {internship}?'
+                data[f'answer_{k + 1}'] = 'yes' if k % 2 == 0 else 'no'
+            if self.scale.questions:
+                data['question_1'] = f'Question 1 for internship {internship}, revision {n}?'
+            return Call(user_id, role, 'POST', f'/employer/questions/{internship}', data)
+
+        def quiz(n):
+            # The last slot is never applied to while the dataset keeps fewer applications than pairs
+            student = n % self.scale.students
+            internship = internship_for(self.scale, student, self.scale.internships - 1)
+            return Call(student_id(self.scale, student), 'student', 'GET', f'/quiz/{internship}', None)
+
+        def anonymous(method, path, data=None):
+            return lambda n: Call(None, None, method, path, data)
+
+        internship_form = {'title': 'Bench Intern', 'description': 'Work on Python and SQL projects.',
+                           'department': 'Computer Science', 'location': 'Remote', 'skills': 'Python, SQL, Flask'}
+
+        return {
+            'index': anonymous('GET', '/'),
+            'register_form': anonymous('GET', '/register'),
+            'register': register,
+            'login_form': anonymous('GET', '/login'),
+            'login': lambda n: Call(None, None, 'POST', '/login',
+                                    {'email': f'student{n % self.scale.students + 1}@bench.test', 'password': PASSWORD}),
+            'forgot_password_form': anonymous('GET', '/forgot-password'),
+            'forgot_password': lambda n: Call(None, None, 'POST', '/forgot-password',
+                                              {'email': f'student{n % self.scale.students + 1}@bench.test'}),
+            'reset_password_form': reset_password('GET'),
+            'reset_password': reset_password('POST'),
+            'logout': as_student('GET', '/logout'),
+            'student_dashboard': as_student('GET', '/student/dashboard'),
+            'search': as_student('GET', lambda n: '/search?' + urlencode({'q': ('python', 'intern', 'kigali remote',
+                                                                                'data')[n % 4]})),
+            'edit_student_form': as_student('GET', '/student/edit'),
+            'edit_student': as_student('POST', '/student/edit', {
+                'full_name': 'Bench Student', 'department': 'Computer Science', 'skills': 'Python, SQL, Docker',
+            }),
+            'quiz_form': quiz,
+            'submit_quiz': submit_quiz,
+            'apply': apply,
+            'employer_dashboard': as_employer('GET', '/employer/dashboard'),
+            'post_internship_form': as_employer('GET', '/employer/post'),
+            'post_internship': as_employer('POST', '/employer/post', internship_form),
+            'edit_internship_form': as_employer('GET', '/employer/edit/{id}'),
+            'edit_internship': as_employer('POST', '/employer/edit/{id}', internship_form),
+            'view_applicants': as_employer('GET', '/employer/applicants/{id}'),
+            'export_applicants': as_employer('GET', '/employer/applicants/{id}/export?format=csv'),
+            'manage_questions_form': as_employer('GET', '/employer/questions/{id}'),
+            'manage_questions': save_questions,
+            'save_question_bank': as_employer('POST', '/employer/questions/{id}/bank', {'name': BANK_NAME}),
+            'apply_question_bank': apply_bank,
+            'employer_analytics': as_employer('GET', '/employer/analytics'),
+            'metrics': anonymous('GET', '/metrics'),
+            # JSON API
+            'api_internships': as_student('GET', '/api/v1/internships'),
+            'api_search': as_student('GET', lambda n: '/api/v1/internships?' + urlencode({'q': ('python', 'intern',
+                                                                                               'remote')[n % 3]})),
+            'api_internship': as_student('GET', lambda n: f'/api/v1/internships/{n % self.scale.internships + 1}'),
+            'api_applicants': as_employer('GET', '/api/v1/internships/{id}/applicants'),
+            'api_matches': as_student('GET', '/api/v1/me/matches'),
+            'api_recommendations': as_student('GET', '/api/v1/me/recommendations'),
+            'api_applications': as_student('GET', '/api/v1/me/applications'),
+        }
+
+
+# --------------------------
+# Statistics
+# --------------------------
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(route, phase, latencies, errors, queries=None, peak=None):
+    latencies = sorted(latencies)
+    ms = lambda value: round(value * 1000, 2)  # noqa: E731
+    return Result(route, phase, len(latencies), errors,
+                  ms(percentile(latencies, 50)), ms(percentile(latencies, 95)), ms(percentile(latencies, 99)),
+                  queries, peak)
+
+
+def is_error(status):
+    return status >= 500
+
+
+# --------------------------
+# Phase 1: sequential, through the test client
+# --------------------------
+class StatementCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def _log_in(client, call):
+    with client.session_transaction() as sess:
+        sess.clear()
+        if call.user_id is not None:
+            sess['user_id'], sess['role'] = call.user_id, call.role
+
+
+def run_test_client(app, scenarios, requests, log):
+    client = app.test_client()
+    with app.app_context():
+        counter = StatementCounter(db.engine)
+
+    results = []
+    for route, make_call in scenarios.calls().items():
+        latencies, errors, statements = [], 0, 0
+        for n in range(requests):
+            call = make_call(n)
+            _log_in(client, call)
+            before = counter.count
+            start = time.perf_counter()
+            response = client.open(call.path, method=call.method, data=call.data)
+            response.get_data()
+            latencies.append(time.perf_counter() - start)
+            statements += counter.count - before
+            errors += is_error(response.status_code)
+
+        # Memory is traced for one extra request only, tracemalloc slows everything down
+        call = make_call(requests)
+        _log_in(client, call)
+        tracemalloc.start()
+        client.open(call.path, method=call.method, data=call.data).get_data()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        result = summarize(route, 'client', latencies, errors, round(statements / requests, 1), peak // 1024)
+        log(format_result(result))
+        results.append(result)
+    return results
+
+
+# --------------------------
+# Phase 2: concurrent, over HTTP
+# --------------------------
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def run_http(app, scenarios, requests, concurrency, log):
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=_QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    signer = app.session_interface.get_signing_serializer(app)
+    cookie_name = app.config['SESSION_COOKIE_NAME']
+    local = threading.local()
+
+    def send(call):
+        if not hasattr(local, 'conn'):
+            local.conn = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=60)
+        headers = {}
+        if call.user_id is not None:
+            headers['Cookie'] = f"{cookie_name}={signer.dumps({'user_id': call.user_id, 'role': call.role})}"
+        body = None
+        if call.data is not None:
+            body = urlencode(call.data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        start = time.perf_counter()
+        try:
+            local.conn.request(call.method, call.path, body=body, headers=headers)
+            response = local.conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            local.conn.close()
+            del local.conn
+            status = 599
+        return time.perf_counter() - start, status
+
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for route, make_call in scenarios.calls().items():
+                calls = [make_call(n) for n in range(requests)]
+                started = time.perf_counter()
+                outcomes = list(pool.map(send, calls))
+                elapsed = time.perf_counter() - started
+                result = summarize(route, 'http', [latency for latency, _ in outcomes],
+                                   sum(is_error(status) for _, status in outcomes))
+                log(format_result(result) + f"  {len(calls) / elapsed:8.1f} req/s")
+                results.append(result)
+    finally:
+        server.shutdown()
+    return results
+
+
+# --------------------------
+# Reporting and baseline comparison
+# --------------------------
+def format_result(result):
+    line = (f"{result.phase:6} {result.route:24} n={result.count:<5} err={result.errors:<3} "
+            f"p50={result.p50:8.2f}ms p95={result.p95:8.2f}ms p99={result.p99:8.2f}ms")
+    if result.queries is not None:
+        line += f"  queries={result.queries:<5} peak={result.peak_kib}KiB"
+    return line
+
+
+def to_json(results, scale, max_rss_kib):
+    return {
+        'scale': scale._asdict(),
+        'max_rss_kib': max_rss_kib,
+        'routes': {f'{r.phase}:{r.route}': r._asdict() for r in results},
+    }
+
+
+def compare(report, baseline, tolerance, slack_ms):
+    """Regressions against a saved report: slower p95, more queries, or new errors"""
+    problems = []
+    for key, old in baseline.get('routes', {}).items():
+        new = report['routes'].get(key)
+        if new is None:
+            continue
+        if new['p95'] > old['p95'] * (1 + tolerance) + slack_ms:
+            problems.append(f"{key}: p95 {old['p95']}ms -> {new['p95']}ms")
+        if old.get('queries') is not None and new['queries'] is not None and new['queries'] > old['queries']:
+            problems.append(f"{key}: queries/request {old['queries']} -> {new['queries']}")
+        if new['errors'] > old['errors']:
+            problems.append(f"{key}: errors {old['errors']} -> {new['errors']}")
+    if baseline.get('scale') and baseline['scale'] != report['scale']:
+        problems.insert(0, f"warning: baseline was recorded at scale {baseline['scale']}")
+    return problems
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    data = parser.add_argument_group('dataset')
+    data.add_argument('--database-url', help="Defaults to a temporary SQLite file.")
+    data.add_argument('--no-seed', action='store_true', help="Reuse a database seeded by an earlier run.")
+    data.add_argument('--employers', type=int, default=100)
+    data.add_argument('--students', type=int, default=2000)
+    data.add_argument('--internships', type=int, default=2000)
+    data.add_argument('--applications', type=int, default=20000)
+    data.add_argument('--questions', type=int, default=8, help="Technical questions per internship.")
+    run = parser.add_argument_group('run')
+    run.add_argument('--requests', type=int, default=50, help="Requests per route and phase.")
+    run.add_argument('--concurrency', type=int, default=8, help="HTTP client threads.")
+    run.add_argument('--skip-http', action='store_true')
+    run.add_argument('--output', help="Write the JSON report here.")
+    run.add_argument('--save-baseline', metavar='PATH', help="Store this run as the baseline.")
+    run.add_argument('--baseline', metavar='PATH', help="Fail if this run regressed against PATH.")
+    run.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative p95 increase.")
+    run.add_argument('--slack-ms', type=float, default=2.0, help="Allowed absolute p95 increase.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix='bench-') as workdir:
+        return run(args, workdir)
+
+
+def run(args, workdir):
+    log = lambda message: print(message, file=sys.stderr, flush=True)  # noqa: E731
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'SECRET_KEY': 'bench',
+        'APP_BASE_URL': 'http://bench.test',
+        'QUERY_BUDGET_ENFORCED': False,
+    })
+
+    with app.app_context():
+        prepare_schema()
+        if args.no_seed:
+            scale = existing_scale(args.questions)
+        else:
+            scale = Scale(args.employers, args.students, args.internships, args.applications, args.questions)
+            started = time.perf_counter()
+            seed(scale, log=log)
+            log(f"seeded in {time.perf_counter() - started:.1f}s")
+        db.session.remove()
+
+    scenarios = Scenarios(scale, app)
+    results = run_test_client(app, scenarios, args.requests, log)
+    if not args.skip_http:
+        results += run_http(app, scenarios, args.requests, args.concurrency, log)
+
+    max_rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    log(f"peak RSS {max_rss_kib} KiB")
+    report = to_json(results, scale, max_rss_kib)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(report, json.load(f), args.tolerance, args.slack_ms)
+        for problem in problems:
+            log(problem)
+        if any(not problem.startswith('warning:') for problem in problems):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+import math
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from app.auth import hash_password
+from app.matching import normalize_skill
+from app.analytics import rebuild_rollups
+from app.counters import reconcile_counters, reconcile_row_counts
+from app.models import (db, Profile, Internship, TechnicalQuestion, Application, BankQuestion, QuestionBank, Skill,
+                        internship_skill, profile_skill)
+from app.recommend import refresh_recommendations
+from app.search import create_search_index, rebuild_search_index
+
+SKILL_NAMES = [
+    'Python', 'SQL', 'Go', 'Rust', 'Java', 'JavaScript', 'TypeScript', 'React', 'Flask', 'Django',
+    'PostgreSQL', 'Docker', 'Kubernetes', 'AWS', 'Linux', 'Git', 'C', 'C++', 'Machine Learning',
+    'Data Analysis', 'Excel', 'Figma', 'Networking', 'Security', 'Android', 'iOS', 'Swift', 'Kotlin',
+    'Statistics', 'Communication', 'Project Management', 'Accounting', 'Marketing', 'Writing',
+    'Electronics', 'CAD', 'MATLAB', 'R', 'Tableau', 'Spark',
+]
+DEPARTMENTS = ['Computer Science', 'Engineering', 'Business', 'Design', 'Mathematics', 'Finance']
+LOCATIONS = ['Kigali', 'Nairobi', 'Remote', 'Lagos', 'Accra', 'Kampala']
+SKILLS_PER_ROW = 3
+PASSWORD = 'bench'  # every seeded profile signs in with it
+BANK_NAME = 'Bench bank'
+
+# Rows are given explicit ids 1..n so scenarios can address them without queries:
+# employers are profiles 1..employers, students follow them, and each employer
+# has one question bank with the employer's id.
+Scale = namedtuple('Scale', 'employers students internships applications questions')
+
+
+def student_id(scale, index):
+    return scale.employers + 1 + index % scale.students
+
+
+def employer_of(scale, internship_id):
+    return (internship_id - 1) % scale.employers + 1
+
+
+def question_id(scale, internship_id, k):
+    """Id of the k-th technical question of an internship"""
+    return (internship_id - 1) * scale.questions + k + 1
+
+
+def applications_per_student(scale):
+    return math.ceil(scale.applications / scale.students) if scale.students else 0
+
+
+def internship_for(scale, student, slot):
+    """The internship a student's `slot`-th application goes to, distinct for every slot < internships"""
+    return (student * 7919 + slot) % scale.internships + 1
+
+
+def _insert(table, rows, batch_size):
+    """executemany INSERTs of batch_size rows per transaction from any iterable"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+
+
+def _reset_sequences():
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for model in (Profile, Internship, TechnicalQuestion, Application, Skill, QuestionBank):
+        table = model.__tablename__
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 1)) FROM {table}"
+        ))
+    db.session.commit()
+
+
+def seed(scale, batch_size=10000, log=print):
+    """Fill an empty database with a deterministic dataset of the given scale"""
+    if Profile.query.first() is not None:
+        raise RuntimeError("The benchmark database is not empty, pass --no-seed to reuse it.")
+    if scale.applications > scale.students * scale.internships:
+        raise ValueError("More applications than student/internship pairs.")
+    rng = random.Random(42)
+    now = datetime.utcnow()
+
+    _insert(Skill.__table__, [
+        {'id': i + 1, 'key': normalize_skill(name), 'name': name} for i, name in enumerate(SKILL_NAMES)
+    ], batch_size)
+    skill_count = len(SKILL_NAMES)
+
+    log(f"seeding {scale.employers} employers and {scale.students} students")
+    password_hash = hash_password(PASSWORD)  # one scrypt run, the salt is shared but verification is real
+    _insert(Profile.__table__, ({
+        'id': i + 1, 'role': 'employer', 'full_name': f'Bench Employer {i + 1}',
+        'email': f'employer{i + 1}@bench.test', 'password_hash': password_hash,
+        'company_name': f'Company {i + 1}', 'created_at': now,
+    } for i in range(scale.employers)), batch_size)
+    _insert(Profile.__table__, ({
+        'id': student_id(scale, i), 'role': 'student', 'full_name': f'Bench Student {i + 1}',
+        'email': f'student{i + 1}@bench.test', 'password_hash': password_hash,
+        'department': DEPARTMENTS[i % len(DEPARTMENTS)], 'created_at': now,
+    } for i in range(scale.students)), batch_size)
+    _insert(profile_skill, ({
+        'profile_id': student_id(scale, i), 'skill_id': (i * 7 + k * 13) % skill_count + 1,
+    } for i in range(scale.students) for k in range(SKILLS_PER_ROW)), batch_size)
+
+    log(f"seeding {scale.internships} internships with {scale.questions} questions each")
+    _insert(Internship.__table__, ({
+        'id': i, 'employer_id': employer_of(scale, i), 'title': f'{SKILL_NAMES[i % skill_count]} Intern {i}',
+        'description': f'Work on {SKILL_NAMES[(i * 3) % skill_count]} and {SKILL_NAMES[(i * 5) % skill_count]} projects.',
+        'department': DEPARTMENTS[i % len(DEPARTMENTS)], 'location': LOCATIONS[i % len(LOCATIONS)],
+        'created_at': now - timedelta(minutes=i),
+    } for i in range(1, scale.internships + 1)), batch_size)
+    _insert(internship_skill, ({
+        'internship_id': i, 'skill_id': (i * 11 + k * 13) % skill_count + 1,
+    } for i in range(1, scale.internships + 1) for k in range(SKILLS_PER_ROW)), batch_size)
+    _insert(TechnicalQuestion.__table__, ({
+        'id': question_id(scale, i, k), 'internship_id': i, 'question': f'Question {k + 1} for internship {i}?',
+        'correct_answer': k % 2 == 0, 'notes': '',
+    } for i in range(1, scale.internships + 1) for k in range(scale.questions)), batch_size)
+    _insert(QuestionBank.__table__, ({
+        'id': e, 'employer_id': e, 'name': BANK_NAME, 'created_at': now, 'updated_at': now,
+    } for e in range(1, scale.employers + 1)), batch_size)
+    _insert(BankQuestion.__table__, ({
+        'bank_id': e, 'position': k, 'question': f'Shared question {k + 1} of employer {e}?',
+        'correct_answer': k % 2 == 1, 'notes': '',
+    } for e in range(1, scale.employers + 1) for k in range(scale.questions)), batch_size)
+
+    log(f"seeding {scale.applications} applications")
+    def applications():
+        for n in range(scale.applications):
+            student, slot = n % scale.students, n // scale.students
+            score = rng.choice((25, 50, 62, 75, 87, 100))
+            yield {
+                'student_id': student_id(scale, student), 'internship_id': internship_for(scale, student, slot),
+                'applied_at': now - timedelta(seconds=n), 'quiz_score': score, 'quiz_passed': score >= 75,
+            }
+    _insert(Application.__table__, applications(), batch_size)
+    _reset_sequences()
+    reconcile_counters()
+    reconcile_row_counts()
+
+    log("rolling up analytics")
+    rebuild_rollups()
+
+    log("building the search index")
+    rebuild_search_index()
+
+    log("precomputing recommendations")
+    refresh_recommendations([student_id(scale, i) for i in range(scale.students)])
+
+
+def prepare_schema():
+    db.create_all()
+    create_search_index()
+
+
+def existing_scale(questions):
+    """Scale of a database seeded earlier by seed()"""
+    roles = dict(db.session.query(Profile.role, db.func.count(Profile.id)).group_by(Profile.role))
+    return Scale(
+        employers=roles.get('employer', 0),
+        students=roles.get('student', 0),
+        internships=db.session.query(db.func.count(Internship.id)).scalar(),
+        applications=db.session.query(db.func.count(Application.id)).scalar(),
+        questions=questions,
+    )
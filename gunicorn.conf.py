@@ -0,0 +1,48 @@
+"""gunicorn settings, e.g. `gunicorn -c gunicorn.conf.py wsgi:app`
+
+The app is imported once in the master (preload_app) and forked into the
+workers, so they share its memory copy-on-write and start without
+importing anything. Every value can be overridden from the environment.
+"""
+import gc
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+
+# Requests spend most of their time waiting on the database, so a few
+# threads per process serve more requests than extra processes would.
+# Keep threads at or below DB_POOL_SIZE.
+worker_class = 'gthread'
+workers = _env_int('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2, 8))
+threads = _env_int('GUNICORN_THREADS', 4)
+
+preload_app = True
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# Recycle workers now and then, bounding what the per-process caches can grow to
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 200)
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def pre_fork(server, worker):
+    # Objects allocated while preloading are never freed, keep the collector
+    # from touching (and so copying) their pages in every worker
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app.config import dispose_engines
+    dispose_engines(server.app.wsgi())
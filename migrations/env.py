@@ -46,6 +46,17 @@ def get_metadata():
     return target_db.metadata
 
 
+# The full-text index is created by app/search.py, not the models. FTS5 adds
+# internship_fts_* shadow tables of its own. Autogenerate must not drop them.
+SEARCH_TABLES = ('internship_fts', 'internship_search')
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'table' and reflected and compare_to is None and name.startswith(SEARCH_TABLES):
+        return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -60,7 +71,7 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), include_object=include_object, literal_binds=True
     )
 
     with context.begin_transaction():
@@ -88,15 +99,30 @@ def run_migrations_online():
     connectable = get_engine()
 
     with connectable.connect() as connection:
-        context.configure(
-            connection=connection,
-            target_metadata=get_metadata(),
-            process_revision_directives=process_revision_directives,
-            **current_app.extensions['migrate'].configure_args
-        )
-
-        with context.begin_transaction():
-            context.run_migrations()
+        sqlite = connection.dialect.name == 'sqlite'
+        if sqlite:
+            # Batch migrations copy and drop tables, which must not fire the
+            # ON DELETE CASCADE rules. The pragma is a no-op inside a transaction.
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            connection.commit()
+        try:
+            context.configure(
+                connection=connection,
+                target_metadata=get_metadata(),
+                process_revision_directives=process_revision_directives,
+                include_object=include_object,
+                **current_app.extensions['migrate'].configure_args
+            )
+
+            with context.begin_transaction():
+                context.run_migrations()
+        finally:
+            if sqlite:
+                # The connection goes back to the app's pool, where the cascades must work
+                if connection.in_transaction():
+                    connection.rollback()
+                connection.exec_driver_sql('PRAGMA foreign_keys=ON')
+                connection.commit()
 
 
 if context.is_offline_mode():
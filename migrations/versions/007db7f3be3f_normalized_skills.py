@@ -0,0 +1,121 @@
+"""replace pickled skill columns with profile_skill / internship_skill
+
+Revision ID: 007db7f3be3f
+Revises: d3715ead4d8a
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+import pickle
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007db7f3be3f'
+down_revision = 'd3715ead4d8a'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+meta = sa.MetaData()
+skill = sa.Table('skill', meta,
+                 sa.Column('id', sa.Integer, primary_key=True),
+                 sa.Column('key', sa.String(100)),
+                 sa.Column('name', sa.String(100)))
+profile_skill = sa.Table('profile_skill', meta,
+                         sa.Column('profile_id', sa.Integer, primary_key=True),
+                         sa.Column('skill_id', sa.Integer, primary_key=True))
+internship_skill = sa.Table('internship_skill', meta,
+                            sa.Column('skill_id', sa.Integer, primary_key=True),
+                            sa.Column('internship_id', sa.Integer, primary_key=True))
+
+
+def _normalize(name):
+    return ' '.join((name or '').split()).lower()
+
+
+def _convert(bind, table, column, links, owner):
+    """Move a pickled list column into its association table, BATCH_SIZE rows per round trip"""
+    skill_ids = {key: id for id, key in bind.execute(sa.select(skill.c.id, skill.c.key))}
+    done = {id for (id,) in bind.execute(sa.select(links.c[owner]).distinct())}
+
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            'SELECT id, {} FROM {} WHERE id > :last_id ORDER BY id LIMIT :limit'.format(column, table)
+        ), {'last_id': last_id, 'limit': BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        batch = []
+        for row_id, blob in rows:
+            if row_id in done or not blob:
+                continue
+            keys = set()
+            for name in pickle.loads(blob):
+                key = _normalize(name)
+                if not key or key in keys:
+                    continue
+                keys.add(key)
+                if key not in skill_ids:
+                    result = bind.execute(skill.insert().values(key=key, name=' '.join(name.split())))
+                    skill_ids[key] = result.inserted_primary_key[0]
+                batch.append({owner: row_id, 'skill_id': skill_ids[key]})
+        if batch:
+            bind.execute(links.insert(), batch)
+
+
+def _restore(bind, table, column, links, owner):
+    """Re-pickle an association table back into its list column"""
+    names = {}
+    query = (sa.select(links.c[owner], skill.c.name)
+             .join(skill, skill.c.id == links.c.skill_id)
+             .order_by(links.c[owner], skill.c.name))
+    for row_id, name in bind.execute(query):
+        names.setdefault(row_id, []).append(name)
+    update = sa.text('UPDATE {} SET {} = :value WHERE id = :id'.format(table, column))
+    values = [{'id': row_id, 'value': pickle.dumps(skills)} for row_id, skills in names.items()]
+    for start in range(0, len(values), BATCH_SIZE):
+        bind.execute(update, values[start:start + BATCH_SIZE])
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # create_app() runs db.create_all(), so the table may already exist
+    if not sa.inspect(bind).has_table('profile_skill'):
+        op.create_table('profile_skill',
+        sa.Column('profile_id', sa.Integer(), nullable=False),
+        sa.Column('skill_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['profile_id'], ['profile.id'], ),
+        sa.ForeignKeyConstraint(['skill_id'], ['skill.id'], ),
+        sa.PrimaryKeyConstraint('profile_id', 'skill_id')
+        )
+        op.create_index('ix_profile_skill_skill_id', 'profile_skill', ['skill_id'], unique=False)
+
+    _convert(bind, 'profile', 'skills', profile_skill, 'profile_id')
+    # The index was kept in sync since d3715ead4d8a, this only picks up stragglers
+    _convert(bind, 'internship', 'required_skills', internship_skill, 'internship_id')
+
+    with op.batch_alter_table('profile') as batch_op:
+        batch_op.drop_column('skills')
+    with op.batch_alter_table('internship') as batch_op:
+        batch_op.drop_column('required_skills')
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    with op.batch_alter_table('internship') as batch_op:
+        batch_op.add_column(sa.Column('required_skills', sa.PickleType(), nullable=True))
+    with op.batch_alter_table('profile') as batch_op:
+        batch_op.add_column(sa.Column('skills', sa.PickleType(), nullable=True))
+
+    _restore(bind, 'internship', 'required_skills', internship_skill, 'internship_id')
+    _restore(bind, 'profile', 'skills', profile_skill, 'profile_id')
+
+    op.drop_index('ix_profile_skill_skill_id', table_name='profile_skill')
+    op.drop_table('profile_skill')
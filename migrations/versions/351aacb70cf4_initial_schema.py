@@ -0,0 +1,74 @@
+"""initial schema
+
+Revision ID: 351aacb70cf4
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+Databases that were created by db.create_all() before migrations existed
+already have these tables, mark them with `flask db stamp 351aacb70cf4`
+and then run `flask db upgrade`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '351aacb70cf4'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('profile',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.Column('full_name', sa.String(length=100), nullable=False),
+    sa.Column('email', sa.String(length=120), nullable=False),
+    sa.Column('department', sa.String(length=100), nullable=True),
+    sa.Column('skills', sa.PickleType(), nullable=True),
+    sa.Column('company_name', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email')
+    )
+    op.create_table('internship',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('employer_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('department', sa.String(length=100), nullable=True),
+    sa.Column('required_skills', sa.PickleType(), nullable=True),
+    sa.Column('location', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['employer_id'], ['profile.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('technical_question',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('internship_id', sa.Integer(), nullable=False),
+    sa.Column('question', sa.Text(), nullable=False),
+    sa.Column('correct_answer', sa.Boolean(), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['internship_id'], ['internship.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('application',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('internship_id', sa.Integer(), nullable=False),
+    sa.Column('applied_at', sa.DateTime(), nullable=True),
+    sa.Column('quiz_passed', sa.Boolean(), nullable=True),
+    sa.Column('quiz_score', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['internship_id'], ['internship.id'], ),
+    sa.ForeignKeyConstraint(['student_id'], ['profile.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('application')
+    op.drop_table('technical_question')
+    op.drop_table('internship')
+    op.drop_table('profile')
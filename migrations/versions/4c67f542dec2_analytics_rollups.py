@@ -0,0 +1,44 @@
+"""daily application rollup for employer analytics
+
+Revision ID: 4c67f542dec2
+Revises: e9b7c7931ea9
+Create Date: 2026-10-18 18:00:00.000000
+
+Run `flask analytics refresh` once after upgrading to fold in the existing
+applications, then from cron every few minutes.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c67f542dec2'
+down_revision = 'e9b7c7931ea9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('application_daily',
+        sa.Column('internship_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('department', sa.String(length=100), nullable=False),
+        sa.Column('score_bucket', sa.Integer(), nullable=False),
+        sa.Column('applicants', sa.Integer(), nullable=False),
+        sa.Column('passed', sa.Integer(), nullable=False),
+        sa.Column('score_total', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['internship_id'], ['internship.id'], ),
+        sa.PrimaryKeyConstraint('internship_id', 'day', 'department', 'score_bucket')
+    )
+    op.create_table('rollup_watermark',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('last_id', sa.Integer(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('rollup_watermark')
+    op.drop_table('application_daily')
@@ -0,0 +1,36 @@
+"""indexes for hot lookup paths, unique application per student and internship
+
+Revision ID: 5442f138d5ff
+Revises: 007db7f3be3f
+Create Date: 2026-10-18 11:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5442f138d5ff'
+down_revision = '007db7f3be3f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the first application per (student_id, internship_id) so the unique index can be built
+    op.execute(
+        'DELETE FROM application WHERE id NOT IN ('
+        'SELECT MIN(id) FROM application GROUP BY student_id, internship_id)'
+    )
+    op.create_index('uq_application_student_id_internship_id', 'application', ['student_id', 'internship_id'], unique=True)
+    op.create_index('ix_application_internship_id_applied_at', 'application', ['internship_id', 'applied_at', 'id'], unique=False)
+    op.create_index('ix_internship_employer_id_created_at', 'internship', ['employer_id', 'created_at', 'id'], unique=False)
+    op.create_index(op.f('ix_technical_question_internship_id'), 'technical_question', ['internship_id'], unique=False)
+    op.create_index(op.f('ix_profile_full_name'), 'profile', ['full_name'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_profile_full_name'), table_name='profile')
+    op.drop_index(op.f('ix_technical_question_internship_id'), table_name='technical_question')
+    op.drop_index('ix_internship_employer_id_created_at', table_name='internship')
+    op.drop_index('ix_application_internship_id_applied_at', table_name='application')
+    op.drop_index('uq_application_student_id_internship_id', table_name='application')
@@ -0,0 +1,62 @@
+"""ON DELETE CASCADE on every foreign key to profile, internship and skill
+
+Revision ID: 75a8a6af1cde
+Revises: 4c67f542dec2
+Create Date: 2026-10-18 19:00:00.000000
+
+SQLite used to ignore foreign keys, so deleting a student left their
+applications behind. Those orphans are removed here and the internship
+counters recomputed; run `flask analytics rebuild` afterwards so the
+rollups drop them too.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '75a8a6af1cde'
+down_revision = '4c67f542dec2'
+branch_labels = None
+depends_on = None
+
+# Postgres' default constraint names, SQLite's reflected (unnamed) keys get the same ones
+NAMING_CONVENTION = {'fk': '%(table_name)s_%(column_0_name)s_fkey'}
+
+# table -> [(column, referenced table)]
+FOREIGN_KEYS = {
+    'internship': [('employer_id', 'profile')],
+    'internship_skill': [('skill_id', 'skill'), ('internship_id', 'internship')],
+    'profile_skill': [('profile_id', 'profile'), ('skill_id', 'skill')],
+    'technical_question': [('internship_id', 'internship')],
+    'application': [('student_id', 'profile'), ('internship_id', 'internship')],
+    'recommendation': [('student_id', 'profile'), ('internship_id', 'internship')],
+    'application_daily': [('internship_id', 'internship')],
+}
+
+
+def _replace_foreign_keys(ondelete):
+    for table, keys in FOREIGN_KEYS.items():
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            for column, referred in keys:
+                name = f'{table}_{column}_fkey'
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    for table, keys in FOREIGN_KEYS.items():
+        for column, referred in keys:
+            op.execute(f'DELETE FROM {table} WHERE {column} NOT IN (SELECT id FROM {referred})')
+    op.execute(
+        'UPDATE internship SET '
+        'applicant_count = (SELECT count(*) FROM application WHERE application.internship_id = internship.id), '
+        'passed_count = (SELECT count(*) FROM application '
+        'WHERE application.internship_id = internship.id AND application.quiz_passed), '
+        'score_total = (SELECT coalesce(sum(quiz_score), 0) FROM application '
+        'WHERE application.internship_id = internship.id)'
+    )
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    _replace_foreign_keys(None)
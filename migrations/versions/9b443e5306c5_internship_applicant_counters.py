@@ -0,0 +1,36 @@
+"""denormalized applicant counters on internship
+
+Revision ID: 9b443e5306c5
+Revises: e247f6f69a2b
+Create Date: 2026-10-18 14:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b443e5306c5'
+down_revision = 'e247f6f69a2b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for name in ('applicant_count', 'passed_count', 'score_total'):
+        op.add_column('internship', sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+    op.execute(
+        'UPDATE internship SET '
+        'applicant_count = (SELECT count(*) FROM application WHERE application.internship_id = internship.id), '
+        'passed_count = (SELECT count(*) FROM application '
+        'WHERE application.internship_id = internship.id AND application.quiz_passed), '
+        'score_total = (SELECT coalesce(sum(quiz_score), 0) FROM application '
+        'WHERE application.internship_id = internship.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('internship') as batch_op:
+        batch_op.drop_column('score_total')
+        batch_op.drop_column('passed_count')
+        batch_op.drop_column('applicant_count')
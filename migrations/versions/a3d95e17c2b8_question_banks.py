@@ -0,0 +1,47 @@
+"""question banks employers reuse across internships
+
+Revision ID: a3d95e17c2b8
+Revises: 75a8a6af1cde
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d95e17c2b8'
+down_revision = '75a8a6af1cde'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('question_bank',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('employer_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['employer_id'], ['profile.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('uq_question_bank_employer_id_name', 'question_bank', ['employer_id', 'name'], unique=True)
+    op.create_table('bank_question',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('bank_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('question', sa.Text(), nullable=False),
+        sa.Column('correct_answer', sa.Boolean(), nullable=False),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['bank_id'], ['question_bank.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_bank_question_bank_id'), 'bank_question', ['bank_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_bank_question_bank_id'), table_name='bank_question')
+    op.drop_table('bank_question')
+    op.drop_index('uq_question_bank_employer_id_name', table_name='question_bank')
+    op.drop_table('question_bank')
@@ -0,0 +1,31 @@
+"""index on internship.updated_at and a maintained internship row count
+
+Revision ID: b81e4f0c9d27
+Revises: a3d95e17c2b8
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81e4f0c9d27'
+down_revision = 'a3d95e17c2b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_internship_updated_at'), 'internship', ['updated_at'], unique=False)
+    op.create_table('row_count',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('rows', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.execute("INSERT INTO row_count (name, rows) SELECT 'internship', count(*) FROM internship")
+
+
+def downgrade():
+    op.drop_table('row_count')
+    op.drop_index(op.f('ix_internship_updated_at'), table_name='internship')
@@ -0,0 +1,28 @@
+"""store password hashes on profile
+
+Revision ID: c3bc30926063
+Revises: 0e0df821c4e5
+Create Date: 2026-10-18 15:30:00.000000
+
+Existing profiles keep a NULL hash, which never matches; they set a password
+through the reset link (/forgot-password).
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3bc30926063'
+down_revision = '0e0df821c4e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('profile', sa.Column('password_hash', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('profile') as batch_op:
+        batch_op.drop_column('password_hash')
@@ -0,0 +1,92 @@
+"""skill -> internship index
+
+Revision ID: d3715ead4d8a
+Revises: 351aacb70cf4
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+import pickle
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3715ead4d8a'
+down_revision = '351aacb70cf4'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def _normalize(name):
+    return ' '.join((name or '').split()).lower()
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # create_app() runs db.create_all(), so the tables may already exist
+    if not inspector.has_table('skill'):
+        op.create_table('skill',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=100), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('key')
+        )
+    if not inspector.has_table('internship_skill'):
+        op.create_table('internship_skill',
+        sa.Column('skill_id', sa.Integer(), nullable=False),
+        sa.Column('internship_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['internship_id'], ['internship.id'], ),
+        sa.ForeignKeyConstraint(['skill_id'], ['skill.id'], ),
+        sa.PrimaryKeyConstraint('skill_id', 'internship_id')
+        )
+        op.create_index('ix_internship_skill_internship_id', 'internship_skill', ['internship_id'], unique=False)
+
+    # Backfill the index from the pickled required_skills, one batch at a time
+    meta = sa.MetaData()
+    skill = sa.Table('skill', meta,
+                     sa.Column('id', sa.Integer, primary_key=True),
+                     sa.Column('key', sa.String(100)),
+                     sa.Column('name', sa.String(100)))
+    internship_skill = sa.Table('internship_skill', meta,
+                                sa.Column('skill_id', sa.Integer, primary_key=True),
+                                sa.Column('internship_id', sa.Integer, primary_key=True))
+    skill_ids = {key: id for id, key in bind.execute(sa.select(skill.c.id, skill.c.key))}
+    indexed = {id for (id,) in bind.execute(sa.select(internship_skill.c.internship_id).distinct())}
+
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            'SELECT id, required_skills FROM internship WHERE id > :last_id ORDER BY id LIMIT :limit'
+        ), {'last_id': last_id, 'limit': BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        links = []
+        for internship_id, blob in rows:
+            if internship_id in indexed or not blob:
+                continue
+            keys = set()
+            for name in pickle.loads(blob):
+                key = _normalize(name)
+                if not key or key in keys:
+                    continue
+                keys.add(key)
+                if key not in skill_ids:
+                    result = bind.execute(skill.insert().values(key=key, name=' '.join(name.split())))
+                    skill_ids[key] = result.inserted_primary_key[0]
+                links.append({'skill_id': skill_ids[key], 'internship_id': internship_id})
+        if links:
+            bind.execute(internship_skill.insert(), links)
+
+
+def downgrade():
+    op.drop_index('ix_internship_skill_internship_id', table_name='internship_skill')
+    op.drop_table('internship_skill')
+    op.drop_table('skill')
@@ -0,0 +1,30 @@
+"""updated_at on profile and internship, versions cached dashboard fragments
+
+Revision ID: e247f6f69a2b
+Revises: f6247d8e9bc6
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e247f6f69a2b'
+down_revision = 'f6247d8e9bc6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('profile', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.add_column('internship', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE profile SET updated_at = created_at')
+    op.execute('UPDATE internship SET updated_at = created_at')
+
+
+def downgrade():
+    with op.batch_alter_table('internship') as batch_op:
+        batch_op.drop_column('updated_at')
+    with op.batch_alter_table('profile') as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,41 @@
+"""precomputed recommendations per student
+
+Revision ID: e9b7c7931ea9
+Revises: c3bc30926063
+Create Date: 2026-10-18 16:00:00.000000
+
+Run `flask recommend refresh` once after upgrading to fill the table.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9b7c7931ea9'
+down_revision = 'c3bc30926063'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() runs db.create_all(), which may have created the table already
+    if sa.inspect(op.get_bind()).has_table('recommendation'):
+        return
+    op.create_table('recommendation',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('internship_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['internship_id'], ['internship.id'], ),
+        sa.ForeignKeyConstraint(['student_id'], ['profile.id'], ),
+        sa.PrimaryKeyConstraint('student_id', 'internship_id')
+    )
+    op.create_index('ix_recommendation_student_id_score', 'recommendation', ['student_id', 'score'], unique=False)
+    op.create_index('ix_recommendation_internship_id', 'recommendation', ['internship_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_recommendation_internship_id', table_name='recommendation')
+    op.drop_index('ix_recommendation_student_id_score', table_name='recommendation')
+    op.drop_table('recommendation')
@@ -0,0 +1,57 @@
+"""full-text search index for internships
+
+Revision ID: f6247d8e9bc6
+Revises: 5442f138d5ff
+Create Date: 2026-10-18 13:00:00.000000
+
+SQLite gets an FTS5 virtual table (internship_fts), Postgres a weighted
+tsvector table (internship_search) behind a GIN index. Both are filled from
+the internship table here and kept in sync by the app afterwards.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6247d8e9bc6'
+down_revision = '5442f138d5ff'
+branch_labels = None
+depends_on = None
+
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(location, '') || ' ' || coalesce(department, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS internship_fts USING fts5("
+            "title, description, location, department, tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute("DELETE FROM internship_fts")
+        op.execute(
+            "INSERT INTO internship_fts (rowid, title, description, location, department) "
+            "SELECT id, title, coalesce(description, ''), coalesce(location, ''), coalesce(department, '') "
+            "FROM internship"
+        )
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS internship_search ("
+            "internship_id INTEGER PRIMARY KEY REFERENCES internship (id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_internship_search_document ON internship_search USING GIN (document)")
+        op.execute("DELETE FROM internship_search")
+        op.execute(f"INSERT INTO internship_search (internship_id, document) SELECT id, {POSTGRES_DOCUMENT} FROM internship")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS internship_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP TABLE IF EXISTS internship_search")
@@ -0,0 +1,86 @@
+"""Every @query_budget view, requested against a small seeded database with the budgets enforced"""
+import pytest
+
+from app import create_app
+from app.fragments import fragments
+from app.models import db
+from app.querycount import QueryBudgetExceeded
+from app.quizbank import quiz_banks
+from benchmarks.seed import Scale, employer_of, prepare_schema, seed, student_id
+
+SCALE = Scale(employers=3, students=20, internships=12, applications=60, questions=8)
+INTERNSHIP = 1
+
+# endpoint: (role, path)
+BUDGETED = {
+    'main.student_dashboard': ('student', '/student/dashboard'),
+    'main.employer_dashboard': ('employer', '/employer/dashboard'),
+    'main.view_applicants': ('employer', f'/employer/applicants/{INTERNSHIP}'),
+    'main.employer_analytics': ('employer', '/employer/analytics'),
+    'api.internships': ('student', '/api/v1/internships'),
+    'api.internship': ('student', f'/api/v1/internships/{INTERNSHIP}'),
+    'api.applicants': ('employer', f'/api/v1/internships/{INTERNSHIP}/applicants'),
+    'api.matches': ('student', '/api/v1/me/matches'),
+    'api.recommendations': ('student', '/api/v1/me/recommendations'),
+    'api.applications': ('student', '/api/v1/me/applications'),
+}
+# Variants that take another path through the view
+EXTRA = [
+    ('student', '/api/v1/internships?q=python'),
+    ('student', '/api/v1/internships?fields=id,title'),
+    ('employer', f'/employer/analytics?internship={INTERNSHIP}&days=7'),
+]
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    path = tmp_path_factory.mktemp('budgets') / 'budgets.db'
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SECRET_KEY': 'test',
+        'TESTING': True,
+        'QUERY_BUDGET_ENFORCED': True,
+    })
+    with app.app_context():
+        prepare_schema()
+        seed(SCALE, log=lambda message: None)
+        db.session.remove()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    # Cold caches, so each request pays for everything it can query
+    fragments.clear()
+    quiz_banks.clear()
+    return app.test_client()
+
+
+def sign_in(client, role):
+    user_id = student_id(SCALE, 0) if role == 'student' else employer_of(SCALE, INTERNSHIP)
+    with client.session_transaction() as sess:
+        sess['user_id'], sess['role'] = user_id, role
+
+
+def test_every_budgeted_view_is_covered(app):
+    budgeted = {endpoint for endpoint, view in app.view_functions.items() if hasattr(view, 'query_budget')}
+    assert budgeted == set(BUDGETED)
+
+
+@pytest.mark.parametrize('role, path', list(BUDGETED.values()) + EXTRA)
+def test_within_budget(client, role, path):
+    sign_in(client, role)
+    response = client.get(path)
+    assert response.status_code == 200
+    etag = response.headers.get('ETag')
+    if etag:
+        assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_budget_is_enforced(app, client, monkeypatch):
+    monkeypatch.setattr(app.view_functions['api.internships'], 'query_budget', 0)
+    sign_in(client, 'student')
+    with pytest.raises(QueryBudgetExceeded):
+        client.get('/api/v1/internships')
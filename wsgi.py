@@ -0,0 +1,16 @@
+"""Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+
+The app no longer creates tables on startup. Run `flask db upgrade` and
+`flask assets build` as the release step, before the workers start.
+
+Behind nginx, set PROXY_FIX_HOPS=1 so client addresses come from
+X-Forwarded-For, and APP_BASE_URL to the public URL mailed links use.
+"""
+from app import create_app
+from app.assets import assets
+
+app = create_app()
+
+# With preload_app this runs once in the gunicorn master and the workers inherit the result
+with app.app_context():
+    assets.manifest()